@@ -0,0 +1,129 @@
+import os
+import statistics
+
+MEMORY = 1024 * 1024 * 1024
+"""The peak memory assumed for a build of a library with no history, in
+bytes."""
+
+RESERVE = 512 * 1024 * 1024
+"""The memory kept free for the rest of the system, in bytes - no builds are
+started while less than this is available."""
+
+
+def available():
+    """The memory available for starting new processes without swapping.
+
+    Returns:
+        The available memory in bytes, or ``None`` if it cannot be determined.
+    """
+
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class Admission:
+    """Decide when the memory is available to start more builds.
+
+    Every task is expected to use the peak memory of a build of its library
+    times the number of builds it runs in parallel. Tasks are admitted while
+    the expected memory of every running task fits in the budget - by default
+    the memory available when this is created - and the system has at least
+    ``RESERVE`` bytes available, so the number of concurrent builds adapts to
+    the libraries being built rather than being fixed.
+
+    The peak memory of a library is the largest observed so far (see
+    ``observe()``), initially taken from the resource usage recorded by
+    previous runs (see ``history.History``). Libraries with no history are
+    assumed to use the median peak of those with history, or ``MEMORY``.
+
+    A task is always admitted if no other task is running, so that work
+    progresses even if it is expected to exceed the budget.
+
+    Args:
+        peaks (dict): The peak memory of builds of each library recorded by
+            previous runs, in bytes.
+        budget (int): The memory builds may use, in bytes - default: the
+            memory available now less ``RESERVE``.
+    """
+
+    def __init__(self, peaks=None, budget=None):
+        self.peaks = dict(peaks or {})
+        self.default = statistics.median(self.peaks.values()) if self.peaks else MEMORY
+
+        if budget is None:
+            budget = max((available() or 0) - RESERVE, 0) or None
+
+        self.budget = budget
+        self.committed = 0
+        self.running = 0
+
+    def observe(self, library, memory):
+        """Record the peak memory of a build.
+
+        Args:
+            library (str): The library name.
+            memory (int): The peak memory of the build in bytes.
+        """
+
+        self.peaks[library] = max(self.peaks.get(library, 0), memory)
+
+    def expected(self, library, builds=1):
+        """The expected memory of a task, in bytes.
+
+        Args:
+            library (str): The library name.
+            builds (int): The number of builds the task runs in parallel.
+        """
+
+        return self.peaks.get(library, self.default) * builds
+
+    def admit(self, library, builds=1):
+        """Start a task if there is enough memory.
+
+        Args:
+            library (str): The library name.
+            builds (int): The number of builds the task runs in parallel.
+
+        Returns:
+            The memory reserved for the task (to ``release()`` when it
+            completes), or ``None`` if it should not be started yet.
+        """
+
+        expected = self.expected(library, builds)
+
+        if self.running:
+            if self.budget is not None and self.committed + expected > self.budget:
+                return None
+
+            free = available()
+
+            if free is not None and free < RESERVE + expected:
+                return None
+
+        self.committed += expected
+        self.running += 1
+
+        return expected
+
+    def release(self, reserved):
+        """Release the memory reserved for a completed task.
+
+        Args:
+            reserved (int): The value returned by ``admit()``.
+        """
+
+        self.committed -= reserved
+        self.running -= 1
+
+
+__all__ = ["available", "Admission"]
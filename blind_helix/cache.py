@@ -0,0 +1,388 @@
+import os
+import json
+import time
+import base64
+import sqlite3
+import hashlib
+import tempfile
+import subprocess
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from helix import utils as helix_utils
+
+CACHE_ENVIRONMENT_VARIABLE = "BLIND_HELIX_CACHE"
+SIZE_ENVIRONMENT_VARIABLE = "BLIND_HELIX_CACHE_SIZE"
+
+
+def directory(path=None):
+    """Locate (and create, if necessary) the Blind HELIX cache directory.
+
+    Args:
+        path (str): An optional, explicit cache directory. If this is not
+            provided, the ``BLIND_HELIX_CACHE`` environment variable is used if
+            set, otherwise ``blind-helix`` in the user's cache directory
+            (``XDG_CACHE_HOME`` or ``~/.cache``).
+
+    Returns:
+        The absolute path to the cache directory.
+    """
+
+    if not path:
+        path = os.environ.get(CACHE_ENVIRONMENT_VARIABLE)
+
+    if not path:
+        path = os.path.join(
+            os.environ.get("XDG_CACHE_HOME", os.path.join("~", ".cache")),
+            "blind-helix",
+        )
+
+    path = os.path.abspath(os.path.expanduser(path))
+
+    os.makedirs(path, exist_ok=True)
+
+    return path
+
+
+_toolchain = None
+
+
+def toolchain():
+    """Compute a fingerprint of the toolchain used to build Components.
+
+    This is a digest of the version strings of CMake, the C++ compiler, and the
+    linker along with any build-related environment variables. Any change to
+    the toolchain produces a different fingerprint.
+
+    Returns:
+        A hex digest string.
+    """
+
+    global _toolchain
+
+    if _toolchain is not None:
+        return _toolchain
+
+    fingerprint = hashlib.sha256()
+
+    tools = [
+        helix_utils.find("cmake"),
+        os.environ.get("CXX") or helix_utils.find("c++"),
+        helix_utils.find("ld"),
+    ]
+
+    for tool in tools:
+        try:
+            stdout, _ = helix_utils.run("{} --version".format(tool))
+        except subprocess.CalledProcessError:
+            stdout = b""
+
+        fingerprint.update("{}\0".format(tool).encode("utf-8"))
+        fingerprint.update(stdout)
+
+    for variable in ("CXX", "CXXFLAGS", "LDFLAGS"):
+        fingerprint.update(
+            "{}={}\0".format(variable, os.environ.get(variable, "")).encode("utf-8")
+        )
+
+    _toolchain = fingerprint.hexdigest()
+
+    return _toolchain
+
+
+class BuildCache:
+    """A persistent cache of Component build results.
+
+    Results are stored in an SQLite database in the cache directory, keyed by
+    the digest of the (finalized) library file, the function name, and the
+    toolchain fingerprint. SQLite handles locking, so a single cache may be
+    shared by many processes at once.
+
+    Args:
+        path (str): An optional cache directory - see ``directory()``.
+    """
+
+    FILENAME = "builds.sqlite"
+
+    VERSION = 1
+    """The version of the cached build procedure.
+
+    Bump this if the way Components are generated or tested changes so that
+    stale results are ignored.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS builds (
+            library TEXT NOT NULL,
+            function TEXT NOT NULL,
+            toolchain TEXT NOT NULL,
+            succeeded INTEGER NOT NULL,
+            error TEXT,
+            included TEXT,
+            PRIMARY KEY (library, function, toolchain)
+        )
+    """
+
+    def __init__(self, path=None):
+        self.path = os.path.join(directory(path), self.FILENAME)
+        self.toolchain = "{}-{}".format(self.VERSION, toolchain())
+
+        self.connection = sqlite3.connect(self.path, timeout=600)
+
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(self.SCHEMA)
+
+    def get(self, library, function):
+        """Fetch a cached build result.
+
+        Args:
+            library (str): The library file digest.
+            function (str): The function name.
+
+        Returns:
+            A dictionary with ``succeeded`` (bool), ``error`` (the name of the
+            known error class, or ``None``) and ``included`` (a list of function
+            names, or ``None``) fields if there is a cached result, otherwise
+            ``None``.
+        """
+
+        row = self.connection.execute(
+            "SELECT succeeded, error, included FROM builds WHERE library = ? AND function = ? AND toolchain = ?",
+            (library, function, self.toolchain),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        succeeded, error, included = row
+
+        return {
+            "succeeded": bool(succeeded),
+            "error": error,
+            "included": json.loads(included) if included is not None else None,
+        }
+
+    def put(self, library, function, succeeded, error=None, included=None):
+        """Store a build result.
+
+        Args:
+            library (str): The library file digest.
+            function (str): The function name.
+            succeeded (bool): If the build succeeded.
+            error (str): The name of the known error class if the build failed.
+            included (list): An optional list of included function names.
+        """
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO builds VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    library,
+                    function,
+                    self.toolchain,
+                    int(succeeded),
+                    error,
+                    json.dumps(included) if included is not None else None,
+                ),
+            )
+
+    def close(self):
+        self.connection.close()
+
+
+class ExtractionCache:
+    """A content addressed store of library files shared between processes.
+
+    Library file content is written to ``libraries/`` in the cache directory
+    under its SHA-256 digest so that every Library (in every process) with the
+    same content shares a single file on disk.
+
+    Files are populated atomically (written to a temporary file and renamed
+    into place) and every user holds a shared ``flock`` on the file for as long
+    as it is open. When the cache grows beyond its size limit the least
+    recently used files that are not locked are evicted.
+
+    Args:
+        path (str): An optional cache directory - see ``directory()``.
+        size (int): The maximum total size of extracted files in bytes -
+            default: the ``BLIND_HELIX_CACHE_SIZE`` environment variable, or
+            10 GiB.
+    """
+
+    DIRECTORY = "libraries"
+
+    SIZE = 10 * 1024 * 1024 * 1024
+
+    STALE = 60 * 60
+    """The age (in seconds) after which abandoned temporary files are removed."""
+
+    def __init__(self, path=None, size=None):
+        self.path = os.path.join(directory(path), self.DIRECTORY)
+        self.size = size or int(os.environ.get(SIZE_ENVIRONMENT_VARIABLE, self.SIZE))
+
+        os.makedirs(self.path, exist_ok=True)
+
+    def _lock(self, f, exclusive=False, blocking=True):
+        if fcntl is None:
+            return True
+
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+
+        try:
+            fcntl.flock(f.fileno(), operation)
+        except BlockingIOError:
+            return False
+
+        return True
+
+    def _populate(self, path, content):
+        generated = tempfile.NamedTemporaryFile(
+            dir=self.path, prefix=".", suffix=".tmp", delete=False
+        )
+
+        try:
+            with generated:
+                generated.write(content)
+
+            os.chmod(generated.name, 0o444)
+            os.replace(generated.name, path)
+        except:
+            os.unlink(generated.name)
+            raise
+
+    def _open(self, path):
+        """Open and share-lock an extracted file if it (still) exists."""
+
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+
+        self._lock(f)
+
+        # The file may have been evicted (or replaced) between opening and
+        # locking it - only the file currently at ``path`` is valid.
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            current = None
+
+        if current is None or current.st_ino != os.fstat(f.fileno()).st_ino:
+            f.close()
+            return None
+
+        return f
+
+    def extract(self, content, digest=None):
+        """Get an extracted library file, populating the cache if necessary.
+
+        Args:
+            content (bytes): The library file content. Base64 encoded strings
+                are also supported, as is a function returning the content -
+                which is only called if the file is not already cached (or
+                ``digest`` is not given).
+            digest (str): The SHA-256 hex digest of ``content``, if known.
+
+        Returns:
+            An open file object for the extracted file. The file is protected
+            from eviction until this is closed.
+        """
+
+        if digest is None:
+            if callable(content):
+                content = content()
+            if isinstance(content, str):
+                content = base64.b64decode(content)
+
+            digest = hashlib.sha256(content).hexdigest()
+
+        path = os.path.join(self.path, digest)
+
+        populated = False
+
+        while True:
+            f = self._open(path)
+
+            if f is not None:
+                break
+
+            if callable(content):
+                content = content()
+            if isinstance(content, str):
+                content = base64.b64decode(content)
+
+            self._populate(path, content)
+            populated = True
+
+        if populated:
+            self.evict()
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return f
+
+    def evict(self):
+        """Remove least recently used files until the cache fits its size.
+
+        Files that are currently in use (locked) are never removed. Without
+        file locking support nothing is removed.
+        """
+
+        if fcntl is None:
+            return
+
+        entries = []
+        total = 0
+
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            if name.startswith("."):
+                if time.time() - stat.st_mtime > self.STALE:
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.size:
+                break
+
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                continue
+
+            with f:
+                if not self._lock(f, exclusive=True, blocking=False):
+                    continue
+
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    continue
+
+            total -= size
+
+
+__all__ = ["BuildCache", "ExtractionCache"]
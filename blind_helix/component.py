@@ -1,8 +1,17 @@
+import os
+import re
 import abc
+import time
 import tempfile
 
 from helix import component
-from helix import utils
+from helix import exceptions as helix_exceptions
+from helix import transform
+from helix import utils as helix_utils
+
+from . import utils
+from . import errors
+from . import events
 
 
 class LibrarySliceComponent(component.Component):
@@ -49,16 +58,96 @@ class LibrarySliceComponent(component.Component):
     """
     included = []
 
+    MAP = "blind-helix.map"
+    """The name of the linker map written next to the binary by ``test()``."""
+
+    linker_map = False
+    """If the build should write a linker map (see ``members()``)."""
+
     @property
     def libraries(self):
-        return [self.path]
+        libraries = [self.path]
+
+        if self.linker_map:
+            libraries.append("-Wl,-Map={}".format(self.MAP))
+
+        return libraries
+
+    @classmethod
+    def members(cls, artifacts):
+        """List the library archive members linked into a test build.
+
+        This reads the linker map written by ``test()`` rather than the built
+        binary itself.
+
+        Args:
+            artifacts (list): The build artifacts returned by ``test()``.
+
+        Returns:
+            A set of the names of the archive members of this Component's
+            library file that were linked into the build, or ``None`` if there
+            is no linker map.
+        """
+
+        if not artifacts:
+            return None
+
+        path = os.path.join(os.path.dirname(artifacts[0]), cls.MAP)
+
+        try:
+            with open(path, "r", errors="replace") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+
+        # GNU ld, gold and lld all refer to archive members as
+        # ``archive(member)``.
+        pattern = r"{}\(([^()\n]+)\)".format(re.escape(cls.path))
+
+        return set(re.findall(pattern, content))
 
     def generate(self):
         self.functions = ["extern void *{};".format(self.function)]
         self.calls = {"main": ["((void (*)()){})();".format(self.function)]}
 
     @classmethod
-    def test(cls, **kwargs):
+    def blueprint(cls, name="test"):
+        """Create a Blueprint for testing this Component.
+
+        The Blueprint includes a single, finalized instance of this Component
+        that writes a linker map (see ``members()``).
+
+        Args:
+            name (str): The build name - default: "test".
+
+        Returns:
+            A Blueprint instance, ready to be built.
+        """
+
+        c = cls()
+        c.linker_map = True
+        c.generate()
+        c.finalize()
+
+        CMakeCppBlueprint = cls.load_blueprint(cls.blueprints[0])
+
+        return CMakeCppBlueprint(name, [c])
+
+    @classmethod
+    def load_blueprint(cls, name):
+        """Load a Blueprint class by name (see ``blueprint()``).
+
+        Args:
+            name (str): The Blueprint name.
+
+        Returns:
+            The Blueprint class.
+        """
+
+        return helix_utils.load("helix.blueprints", name)
+
+    @classmethod
+    def test(cls, abort=None, limits=None, usage=None, **kwargs):
         """Tests the given Component to ensure that it compiles.
 
         Build errors are propagated - if this function completes without
@@ -66,29 +155,77 @@ class LibrarySliceComponent(component.Component):
         successfully.
 
         Args:
-            **kwargs: Can be used to pass build options to the Blueprint's
-                ``build()`` method.
+            abort (function): An optional function called with each line of
+                build errors as they are written. If it returns a true value
+                the build is stopped immediately and fails (see
+                ``utils.run()``).
+            limits (Limits): Optional resource limits applied to each step
+                of the build (see ``utils.Limits``).
+            usage (Usage): An optional ``Usage`` to which the resources used
+                by the build - including the bytes it wrote - are added,
+                whether it succeeds or not (see ``utils.Usage``).
+            **kwargs: Build options (``propagate``, ``stdout`` and ``stderr``)
+                as accepted by the Blueprint's ``build()`` method.
 
         Note:
             This function may take a very long time - if you want status
             updates, set up a logging handler.
         """
 
-        c = cls()
-        c.generate()
-        c.finalize()
-
-        CMakeCppBlueprint = utils.load("helix.blueprints", cls.blueprints[0])
-        b = CMakeCppBlueprint("test", [c])
+        b = cls.blueprint()
 
         working = tempfile.TemporaryDirectory()
+        started = time.time()
 
         try:
-            artifacts = b.build(working.name, options=kwargs)
+            sources = b.generate(working.name)
+            b.transform(transform.Transform.TYPE_SOURCE, sources)
+
+            # Equivalent to the Blueprint's ``compile()``, but with output
+            # streamed so that known failures can be aborted early.
+            build = os.path.join(working.name, "build")
+            os.makedirs(build)
+
+            cmake = helix_utils.find("cmake")
+
+            # Compilation and linking happen in the same build step - both
+            # are recorded as ``compile`` events.
+            for phase, cmd, message in (
+                (events.CONFIGURE, "{} ..", "cmake invocation failed"),
+                (events.COMPILE, "{} --build .", "make invocation failed"),
+            ):
+                with events.span(phase, cls.library, cls.function) as event:
+                    try:
+                        utils.run(
+                            cmd.format(cmake),
+                            build,
+                            helix_exceptions.BuildFailure(message),
+                            abort=abort,
+                            limits=limits,
+                            usage=usage,
+                            **kwargs
+                        )
+                    except helix_exceptions.BuildFailure:
+                        event["error"] = errors.classify_stream(kwargs.get("stderr"))
+                        raise
+
+            binary = os.path.join(build, b.build_name)
+
+            if not os.path.isfile(binary):
+                raise helix_exceptions.BuildFailure("could not find the final binary")
+
+            artifacts = [binary]
+            b.transform(transform.Transform.TYPE_ARTIFACT, artifacts)
         except Exception as e:
+            if usage is not None:
+                usage.written += utils.written(working.name, started)
+
             working.cleanup()
             raise e
 
+        if usage is not None:
+            usage.written += utils.written(working.name, started)
+
         return working, artifacts
 
 
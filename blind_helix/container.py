@@ -0,0 +1,209 @@
+import io
+import json
+import lzma
+import zlib
+import struct
+import hashlib
+
+from . import exceptions
+
+MAGIC = b"BHLX"
+
+VERSION = 1
+
+HEADER = struct.Struct("<4sHBBIQ")
+
+CHUNK_SIZE = 1 << 20
+
+COMPRESSION_NONE = "none"
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_LZMA = "lzma"
+
+COMPRESSION = {COMPRESSION_NONE: 0, COMPRESSION_ZLIB: 1, COMPRESSION_LZMA: 2}
+
+
+class InvalidContainer(exceptions.BlindHELIXException):
+    """Raised when a container is malformed or unsupported."""
+
+
+class _Identity:
+    """A no-op (de)compression object."""
+
+    eof = True
+
+    def compress(self, data):
+        return bytes(data)
+
+    def decompress(self, data):
+        return bytes(data)
+
+    def flush(self):
+        return b""
+
+
+def _compressor(compression):
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compressobj(9)
+    elif compression == COMPRESSION_LZMA:
+        return lzma.LZMACompressor()
+
+    return _Identity()
+
+
+def _decompressor(compression):
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompressobj()
+    elif compression == COMPRESSION_LZMA:
+        return lzma.LZMADecompressor()
+
+    return _Identity()
+
+
+def detect(data):
+    """Check if the given data is a container.
+
+    Args:
+        data (bytes): The leading bytes of a file (at least ``len(MAGIC)``).
+
+    Returns:
+        ``True`` if ``data`` starts with the container magic bytes.
+    """
+
+    return bytes(data[: len(MAGIC)]) == MAGIC
+
+
+def dump(metadata, payload, f, compression=COMPRESSION_ZLIB):
+    """Write a container to a file.
+
+    A container consists of a fixed size header, a JSON metadata section, and
+    the (optionally compressed) raw library file content::
+
+        +-------+---------+-------------+----------+----------+--------------+
+        | magic | version | compression | reserved | metadata | payload size |
+        | 4s    | H       | B           | B        | size (I) | (Q)          |
+        +-------+---------+-------------+----------+----------+--------------+
+        | metadata (UTF-8 JSON)                                              |
+        +--------------------------------------------------------------------+
+        | payload (compressed, until the end of the file)                    |
+        +--------------------------------------------------------------------+
+
+    All integers are little-endian and the payload size is the size of the
+    uncompressed library file. The payload is compressed and written
+    incrementally so no compressed copy is ever held in memory in full.
+
+    Args:
+        metadata (dict): JSON serializable metadata.
+        payload (bytes): The raw library file content.
+        f (file): An open, binary file-like object.
+        compression (str): The payload compression method - one of
+            ``COMPRESSION`` (default: ``zlib``).
+    """
+
+    if compression not in COMPRESSION:
+        raise ValueError("unsupported compression: {}".format(compression))
+
+    payload = memoryview(payload)
+
+    metadata = dict(metadata)
+    metadata["sha256"] = hashlib.sha256(payload).hexdigest()
+    metadata = json.dumps(metadata).encode("utf-8")
+
+    f.write(
+        HEADER.pack(
+            MAGIC, VERSION, COMPRESSION[compression], 0, len(metadata), len(payload)
+        )
+    )
+    f.write(metadata)
+
+    compressor = _compressor(compression)
+
+    for offset in range(0, len(payload), CHUNK_SIZE):
+        chunk = compressor.compress(payload[offset : offset + CHUNK_SIZE])
+
+        if chunk:
+            f.write(chunk)
+
+    f.write(compressor.flush())
+
+
+def dumps(metadata, payload, compression=COMPRESSION_ZLIB):
+    """Serialize a container to bytes.
+
+    Args:
+        metadata (dict): JSON serializable metadata.
+        payload (bytes): The raw library file content.
+        compression (str): The payload compression method.
+
+    Returns:
+        The serialized container.
+    """
+
+    f = io.BytesIO()
+
+    dump(metadata, payload, f, compression=compression)
+
+    return f.getvalue()
+
+
+def loads(data):
+    """Deserialize a container.
+
+    Args:
+        data (bytes): A serialized container generated with ``dump()``.
+
+    Returns:
+        A tuple of the metadata dictionary and the raw payload (as a
+        ``bytearray``, to avoid an extra copy). The metadata includes the
+        ``sha256`` digest of the payload, which is verified.
+    """
+
+    data = memoryview(data)
+
+    if len(data) < HEADER.size or not detect(data):
+        raise InvalidContainer("not a Blind HELIX container")
+
+    magic, version, compression, _, length, size = HEADER.unpack_from(data)
+
+    if version > VERSION:
+        raise InvalidContainer(
+            "unsupported container version: {} (supported: <= {})".format(
+                version, VERSION
+            )
+        )
+
+    compression = {v: k for k, v in COMPRESSION.items()}.get(compression)
+
+    if compression is None:
+        raise InvalidContainer("unsupported container compression")
+
+    offset = HEADER.size
+
+    metadata = json.loads(bytes(data[offset : offset + length]).decode("utf-8"))
+    offset += length
+
+    payload = bytearray(size)
+    position = 0
+
+    decompressor = _decompressor(compression)
+
+    for start in range(offset, len(data), CHUNK_SIZE):
+        chunk = decompressor.decompress(data[start : start + CHUNK_SIZE])
+
+        if position + len(chunk) > size:
+            raise InvalidContainer("container payload is larger than expected")
+
+        payload[position : position + len(chunk)] = chunk
+        position += len(chunk)
+
+    if position != size or not decompressor.eof:
+        raise InvalidContainer("container payload is truncated")
+
+    # The digest keys extracted library files and build results, so it must
+    # describe these bytes.
+    if metadata.get("sha256") != hashlib.sha256(payload).hexdigest():
+        raise InvalidContainer("container payload does not match its digest")
+
+    return metadata, payload
+
+
+__all__ = ["detect", "dump", "dumps", "loads", "InvalidContainer"]
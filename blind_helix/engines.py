@@ -0,0 +1,539 @@
+import io
+import os
+import abc
+import time
+import shlex
+import shutil
+import tempfile
+import threading
+
+from helix import exceptions as helix_exceptions
+from helix import transform
+from helix import utils as helix_utils
+
+from . import utils
+from . import errors
+from . import events
+from . import server
+from . import jobserver
+from . import exceptions
+
+
+class Engine(metaclass=abc.ABCMeta):
+    """A strategy for building Components to test them.
+
+    Args:
+        limits (Limits): Optional resource limits applied to the build of every
+            Component (see ``utils.Limits``).
+    """
+
+    def __init__(self, limits=None):
+        self.limits = limits
+
+    @abc.abstractmethod
+    def build(self, components, jobs=1):
+        """Build the given Components.
+
+        Args:
+            components (list): A list of Component classes.
+            jobs (int): The number of parallel build jobs - default: 1.
+
+        Returns:
+            An iterator of ``(working, artifacts, stdout, stderr, usage)``
+            tuples, one per Component, in order. ``working`` has a
+            ``cleanup()`` method that must be called once ``artifacts`` are no
+            longer needed, or is ``None`` if the build failed. ``usage`` is
+            the ``Usage`` of the build (see ``utils.Usage``) or ``None`` if it
+            is not known. The iterator has a ``close()`` method that stops any
+            outstanding builds.
+        """
+
+        return iter([])
+
+    def close(self):
+        """Remove anything this engine keeps between builds."""
+
+
+class SingleEngine(Engine):
+    """Build every Component in a separate CMake project.
+
+    This is the default engine. Up to ``jobs`` Components are built at once.
+    Builds are stopped as soon as they report a known error (see ``errors``).
+    """
+
+    def _build(self, component):
+        options = {"stdout": io.BytesIO(), "stderr": io.BytesIO()}
+        usage = utils.Usage(builds=1)
+
+        try:
+            working, artifacts = component.test(
+                abort=errors.classify, limits=self.limits, usage=usage, **options
+            )
+        except helix_exceptions.BuildFailure:
+            working, artifacts = None, None
+
+        stdout = options["stdout"].getvalue().decode("utf-8").strip("\n")
+        stderr = options["stderr"].getvalue().decode("utf-8").strip("\n")
+
+        return working, artifacts, stdout, stderr, usage
+
+    def build(self, components, jobs=1):
+        return utils.imap(self._build, components, jobs=jobs)
+
+
+class _Shared:
+    """A working directory shared by a number of successful builds.
+
+    The directory is removed once every build has been cleaned up.
+    """
+
+    def __init__(self, directory, references):
+        self.directory = directory
+        self.references = references
+
+        self.lock = threading.Lock()
+
+        if references == 0:
+            directory.cleanup()
+
+    def cleanup(self):
+        with self.lock:
+            self.references -= 1
+
+            if self.references == 0:
+                self.directory.cleanup()
+
+
+class BatchEngine(Engine):
+    """Build many Components as separate targets of a single CMake project.
+
+    Components are grouped into batches. Each Component's project is
+    generated into a subdirectory of a single CMake project which is
+    configured once and built with ``make -k`` and ``jobs`` parallel jobs
+    (or as many as the jobserver allows, if there is one - see
+    ``jobserver``). A launcher wrapping every compile and link command
+    records the output of each target separately so that failures can be
+    attributed to individual Components.
+
+    Resource limits are applied to every compile and link command
+    individually by the launcher. Unlike the other engines, builds are not
+    stopped early on a known error - every target of a batch is built.
+
+    Args:
+        size (int): The maximum number of Components per batch - default:
+            ``SIZE``.
+        limits (Limits): Optional resource limits (see ``Engine``).
+    """
+
+    SIZE = 50
+
+    CMAKELISTS = "cmake_minimum_required(VERSION 3.5)\n\nproject(blind-helix)\n\n{}\n"
+
+    def __init__(self, size=None, limits=None):
+        super().__init__(limits)
+
+        self.size = size or self.SIZE
+
+    @property
+    def launcher(self):
+        """A compile/link launcher that redirects output to per-target files."""
+
+        limits = self.limits or utils.Limits()
+
+        lines = ["#!/bin/sh", 'log="$1"', "shift"]
+        lines += ["{} || exit 1".format(command) for command in limits.ulimit]
+
+        if limits.timeout:
+            lines += [
+                'timeout -k 5 {} "$@" >>"$log.stdout" 2>>"$log.stderr"'.format(
+                    limits.timeout
+                ),
+                "status=$?",
+                '[ $status -ne 124 ] || echo "{} after {} seconds" >>"$log.stderr"'.format(
+                    utils.TIMED_OUT, limits.timeout
+                ),
+                "exit $status",
+            ]
+        else:
+            lines.append('exec "$@" >>"$log.stdout" 2>>"$log.stderr"')
+
+        return "\n".join(lines) + "\n"
+
+    def _read(self, path):
+        try:
+            with open(path, "rb") as f:
+                return f.read().decode("utf-8", errors="replace").strip("\n")
+        except FileNotFoundError:
+            return ""
+
+    def _batch(self, components, jobs):
+        working = tempfile.TemporaryDirectory()
+
+        try:
+            return self._build(working, components, jobs)
+        except:
+            working.cleanup()
+            raise
+
+    def _build(self, working, components, jobs):
+        started = time.time()
+
+        launcher = os.path.join(working.name, "launch.sh")
+
+        with open(launcher, "w") as f:
+            f.write(self.launcher)
+
+        targets = []
+        lines = []
+
+        for i, component in enumerate(components):
+            name = "component{}".format(i)
+            directory = os.path.join(working.name, name)
+
+            blueprint = component.blueprint(name)
+
+            os.makedirs(directory)
+
+            sources = blueprint.generate(directory)
+            blueprint.transform(transform.Transform.TYPE_SOURCE, sources)
+
+            log = os.path.join(directory, "build")
+            launch = "sh {} {}".format(shlex.quote(launcher), shlex.quote(log))
+
+            lines.append("add_subdirectory({})".format(name))
+
+            for rule in ("RULE_LAUNCH_COMPILE", "RULE_LAUNCH_LINK"):
+                lines.append(
+                    'set_property(TARGET {} PROPERTY {} "{}")'.format(
+                        name, rule, launch
+                    )
+                )
+
+            targets.append((name, log))
+
+        with open(os.path.join(working.name, "CMakeLists.txt"), "w") as f:
+            f.write(self.CMAKELISTS.format("\n".join(lines)))
+
+        build = os.path.join(working.name, "build")
+        os.makedirs(build)
+
+        cmake = helix_utils.find("cmake")
+        stdout, stderr = io.BytesIO(), io.BytesIO()
+
+        # Events and resource usage are recorded for the whole batch rather
+        # than per Component - usage is divided evenly between them.
+        library = components[0].library
+        usage = utils.Usage()
+
+        try:
+            with events.span(events.CONFIGURE, library):
+                utils.run(
+                    '{} -G "Unix Makefiles" ..'.format(cmake),
+                    build,
+                    helix_exceptions.BuildFailure("cmake invocation failed"),
+                    stdout=stdout,
+                    stderr=stderr,
+                    usage=usage,
+                )
+        except helix_exceptions.BuildFailure:
+            # Configuration failures apply to every Component in the batch.
+            stdout = stdout.getvalue().decode("utf-8", errors="replace").strip("\n")
+            stderr = stderr.getvalue().decode("utf-8", errors="replace").strip("\n")
+
+            usage.written = utils.written(working.name, started)
+            share = usage.split(len(components))
+
+            working.cleanup()
+
+            return [(None, None, stdout, stderr, share) for _ in components]
+
+        # ``make`` takes its parallel jobs from the jobserver if there is one
+        # - an explicit ``-j`` would override it.
+        parallel = "" if jobserver.client() is not None else " -j{}".format(jobs)
+
+        try:
+            with events.span(events.COMPILE, library):
+                utils.run(
+                    "{} --build . -- -k{}".format(cmake, parallel),
+                    build,
+                    helix_exceptions.BuildFailure("make invocation failed"),
+                    stdout=stdout,
+                    stderr=stderr,
+                    usage=usage,
+                )
+        except helix_exceptions.BuildFailure:
+            pass
+
+        usage.written = utils.written(working.name, started)
+        share = usage.split(len(components))
+
+        stderr = stderr.getvalue().decode("utf-8", errors="replace").strip("\n")
+
+        results = []
+
+        for name, log in targets:
+            binary = os.path.join(build, name, name)
+            succeeded = os.path.isfile(binary)
+
+            target_stderr = self._read("{}.stderr".format(log))
+
+            if not succeeded and not target_stderr:
+                # The failure happened outside of the compiler and linker.
+                target_stderr = stderr
+
+            results.append(
+                (
+                    succeeded,
+                    [binary] if succeeded else None,
+                    self._read("{}.stdout".format(log)),
+                    target_stderr,
+                )
+            )
+
+        shared = _Shared(working, sum(1 for r in results if r[0]))
+
+        return [
+            (shared if succeeded else None, artifacts, stdout, stderr, share)
+            for succeeded, artifacts, stdout, stderr in results
+        ]
+
+    def build(self, components, jobs=1):
+        for start in range(0, len(components), self.size):
+            results = iter(self._batch(components[start : start + self.size], jobs))
+
+            try:
+                for result in results:
+                    yield result
+            finally:
+                # Results that are never handed out (e.g., if this is closed
+                # part way through a batch) would keep the directory.
+                for working, *_ in results:
+                    if working is not None:
+                        working.cleanup()
+
+
+class LinkEngine(Engine):
+    """Compile a single stub once and only link it for each Component.
+
+    The source generated for every ``LibrarySliceComponent`` is identical
+    apart from the name of the called function. This engine generates and
+    compiles that source once, calling a placeholder symbol, then links the
+    stub object against the library for each Component, binding the
+    placeholder to the Component's function with ``--defsym``. Compiler and
+    linker flags are taken from the ``CXX``, ``CXXFLAGS`` and ``LDFLAGS``
+    environment variables, as with CMake. Links are stopped as soon as they
+    report a known error (see ``errors``).
+
+    Artifacts (the binary and its linker map) are written to a separate
+    directory for every Component.
+
+    Note:
+        This only supports ``LibrarySliceComponent`` subclasses that do not
+        override ``generate()``.
+    """
+
+    SYMBOL = "blind_helix_function"
+    """The placeholder symbol called by the stub."""
+
+    def __init__(self, limits=None):
+        super().__init__(limits)
+
+        self.compiler = os.environ.get("CXX") or helix_utils.find("c++")
+
+        self.compiler_flags = os.environ.get("CXXFLAGS", "")
+        self.linker_flags = os.environ.get("LDFLAGS", "")
+
+        self._stub = None
+        self._failure = None
+        self._lock = threading.Lock()
+
+    def _compile(self, component, usage):
+        """Generate and compile the stub object (once).
+
+        Args:
+            component: The Component being built.
+            usage (Usage): The ``Usage`` of the Component's build, to which
+                the compilation is added if it happens now.
+
+        Raises:
+            UnexpectedBuildFailure: If the stub does not compile - no
+                Component can be tested without it, so this is raised for
+                every Component.
+        """
+
+        with self._lock:
+            if self._failure is not None:
+                raise self._failure
+
+            if self._stub is None:
+                stub = type(
+                    "Stub", (component,), {"function": self.SYMBOL, "linker_map": False}
+                )
+
+                directory = tempfile.TemporaryDirectory()
+
+                sources = stub.blueprint("stub").generate(directory.name)
+                source = [s for s in sources if s.endswith(".cpp")][0]
+
+                output = os.path.join(directory.name, "stub.o")
+                stderr = io.BytesIO()
+
+                try:
+                    with events.span(events.COMPILE, component.library):
+                        utils.run(
+                            "{} {} -c {} -o {}".format(
+                                self.compiler,
+                                self.compiler_flags,
+                                shlex.quote(source),
+                                shlex.quote(output),
+                            ),
+                            directory.name,
+                            helix_exceptions.BuildFailure("failed to compile the stub"),
+                            stderr=stderr,
+                            limits=self.limits,
+                            usage=usage,
+                        )
+                except helix_exceptions.BuildFailure:
+                    directory.cleanup()
+
+                    self._failure = exceptions.UnexpectedBuildFailure(
+                        "failed to compile the stub",
+                        errors=stderr.getvalue().decode("utf-8", errors="replace"),
+                    )
+
+                    raise self._failure
+
+                self._stub = (directory, output)
+
+        return self._stub[1]
+
+    def _build(self, component):
+        # The stub is compiled once for every Component, so its compilation
+        # is accounted to whichever Component is built first.
+        usage = utils.Usage(builds=1)
+        stub = self._compile(component, usage)
+
+        working = tempfile.TemporaryDirectory()
+        binary = os.path.join(working.name, "test")
+
+        options = {"stdout": io.BytesIO(), "stderr": io.BytesIO()}
+
+        started = time.time()
+
+        try:
+            with events.span(
+                events.LINK, component.library, component.function
+            ) as event:
+                try:
+                    utils.run(
+                        "{} {} {} {} -o {} {} -Wl,-u,{} -Wl,--defsym={}={} -Wl,-Map={}".format(
+                            self.compiler,
+                            self.compiler_flags,
+                            self.linker_flags,
+                            shlex.quote(stub),
+                            shlex.quote(binary),
+                            shlex.quote(component.path),
+                            component.function,
+                            self.SYMBOL,
+                            component.function,
+                            shlex.quote(os.path.join(working.name, component.MAP)),
+                        ),
+                        working.name,
+                        helix_exceptions.BuildFailure("link failed"),
+                        abort=errors.classify,
+                        limits=self.limits,
+                        usage=usage,
+                        **options
+                    )
+                except helix_exceptions.BuildFailure:
+                    event["error"] = errors.classify_stream(options["stderr"])
+                    raise
+        except helix_exceptions.BuildFailure:
+            usage.written = utils.written(working.name, started)
+
+            working.cleanup()
+            working = None
+        else:
+            usage.written = utils.written(working.name, started)
+
+        stdout = options["stdout"].getvalue().decode("utf-8").strip("\n")
+        stderr = options["stderr"].getvalue().decode("utf-8").strip("\n")
+
+        return working, [binary] if working else None, stdout, stderr, usage
+
+    def build(self, components, jobs=1):
+        return utils.imap(self._build, components, jobs=jobs)
+
+    def close(self):
+        with self._lock:
+            if self._stub is not None:
+                self._stub[0].cleanup()
+                self._stub = None
+
+
+class _Output:
+    """A directory of artifacts returned by the build server."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ServerEngine(Engine):
+    """Submit Components to a running build server (see ``server.Server``).
+
+    The server keeps configured CMake projects between builds so only the
+    compile and link steps are run for each Component. Up to ``jobs``
+    Components are submitted at once - the server decides how many of them
+    are built in parallel.
+
+    Args:
+        path (str): The server socket path (see ``server.address()``).
+        limits (Limits): Optional resource limits (see ``Engine``), sent to
+            the server with every Component.
+
+    Note:
+        Only the library path and function name are sent to the server, so
+        this only supports ``LibrarySliceComponent`` subclasses that do not
+        override ``generate()``. The server must share a filesystem with the
+        client.
+    """
+
+    def __init__(self, path=None, limits=None):
+        super().__init__(limits)
+
+        self.client = server.Client(path)
+
+    def _build(self, component):
+        # Builds on the server are recorded as a single ``compile`` event.
+        with events.span(
+            events.COMPILE, component.library, component.function
+        ) as event:
+            response = self.client.build(
+                component.path, component.function, limits=self.limits
+            )
+
+            if not response["succeeded"]:
+                known = errors.classify(response["stderr"])
+                event["error"] = known.__name__ if known else "BuildFailure"
+
+        artifacts = response["artifacts"]
+        working = None
+
+        if response["succeeded"]:
+            working = _Output(os.path.dirname(artifacts[0]))
+
+        # Servers older than resource accounting do not report usage.
+        usage = None
+        if response.get("usage") is not None:
+            usage = utils.Usage.fromdict(response["usage"])
+
+        return working, artifacts, response["stdout"], response["stderr"], usage
+
+    def build(self, components, jobs=1):
+        return utils.imap(self._build, components, jobs=jobs)
+
+
+__all__ = ["Engine", "SingleEngine", "BatchEngine", "LinkEngine", "ServerEngine"]
@@ -1,7 +1,13 @@
 import abc
 
+from . import utils
+
 
 class Error:
+    transient = False
+    """If this failure depends on the build environment (e.g., resource limits)
+    rather than on the library alone, so should not be cached."""
+
     @abc.abstractmethod
     def check(self, errors):
         """Check if the given errors are known.
@@ -55,7 +61,97 @@ class UndefinedReference(ContainsError):
     keyword = "undefined reference to"
 
 
-types = [NotDeclared, UndefinedReference]
+class TimedOut(ContainsError):
+    """When a build takes longer than its time limit.
+
+    The build is stopped (see ``utils.Limits``) - this usually indicates a very
+    large link or a runaway compilation.
+    """
+
+    keyword = utils.TIMED_OUT
+
+    transient = True
+
+
+class ResourceExceeded(Error):
+    """When a build runs out of memory or CPU time.
+
+    This occurs when a build exceeds its resource limits (see
+    ``utils.Limits``) or the system runs out of memory.
+    """
+
+    keywords = [
+        "memory exhausted",
+        "out of memory allocating",
+        "Cannot allocate memory",
+        "std::bad_alloc",
+        "Killed signal terminated program",
+        "CPU time limit exceeded",
+        "terminated with signal 9",
+    ]
+
+    transient = True
+
+    def check(self, errors):
+        return any(keyword in errors for keyword in self.keywords)
+
+
+types = [NotDeclared, UndefinedReference, TimedOut, ResourceExceeded]
+
+
+def classify(errors):
+    """Find the known error class of a given failure.
+
+    Args:
+        errors (str): The stderr output of the build command.
+
+    Returns:
+        The first class from ``types`` that recognizes the build failure, or
+        ``None`` if the failure is not of a known type.
+    """
+
+    for error in types:
+        e = error()
+
+        if e.check(errors):
+            return error
+
+    return None
+
+
+def classify_stream(stream):
+    """Find the known error class of a failure captured in a stream.
+
+    Args:
+        stream (file): The file-like object the build's stderr was written to
+            - only in-memory streams (e.g., ``io.BytesIO``) can be read back.
+
+    Returns:
+        The name of the known error class, or ``None`` if the failure is not
+        of a known type or its output was not captured.
+    """
+
+    if not hasattr(stream, "getvalue"):
+        return None
+
+    error = classify(stream.getvalue().decode("utf-8", errors="replace"))
+
+    return error.__name__ if error else None
+
+
+def transient(name):
+    """Determine if a recorded failure should be retried.
+
+    Args:
+        name (str): The name of a known error class (e.g., as recorded in a
+            journal), or ``None``.
+
+    Returns:
+        ``True`` if ``name`` is a ``transient`` error class, ``False``
+        otherwise.
+    """
+
+    return any(error.transient for error in types if error.__name__ == name)
 
 
 def known(errors):
@@ -72,10 +168,4 @@ def known(errors):
         ``True`` if the build failure is a known type, ``False`` otherwise.
     """
 
-    for error in types:
-        e = error()
-
-        if e.check(errors):
-            return True
-
-    return False
+    return classify(errors) is not None
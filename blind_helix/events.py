@@ -0,0 +1,303 @@
+import os
+import json
+import math
+import time
+import threading
+import contextlib
+
+EVENTS_ENVIRONMENT_VARIABLE = "BLIND_HELIX_EVENTS"
+
+RESOLVE = "resolve"
+FINALIZE = "finalize"
+PARSE = "parse"
+CONFIGURE = "configure"
+COMPILE = "compile"
+LINK = "link"
+INCLUDED = "included-parse"
+SAVE = "save"
+
+PHASES = (RESOLVE, FINALIZE, PARSE, CONFIGURE, COMPILE, LINK, INCLUDED, SAVE)
+"""Every phase an event may be recorded for, in pipeline order."""
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class Stream:
+    """An append-only JSON lines file of timing events.
+
+    Every event is written with a single ``write()`` to a file opened in
+    append mode, so any number of processes may record events to the same
+    file at once.
+
+    Args:
+        path (str): The path to the events file. It is created if it does not
+            exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def record(
+        self,
+        phase,
+        library,
+        function=None,
+        start=None,
+        end=None,
+        outcome=None,
+        error=None,
+    ):
+        """Record a single event.
+
+        Args:
+            phase (str): One of ``PHASES``.
+            library (str): The library name.
+            function (str): The function name, if the event concerns a single
+                function.
+            start (float): The start time (seconds since the epoch).
+            end (float): The end time (seconds since the epoch).
+            outcome (str): ``SUCCEEDED`` or ``FAILED``.
+            error (str): The name of the known error class (see ``errors``) or
+                exception that caused a failure.
+        """
+
+        event = {
+            "phase": phase,
+            "library": library,
+            "function": function,
+            "start": start,
+            "end": end,
+            "outcome": outcome,
+            "error": error,
+            "process": os.getpid(),
+        }
+
+        os.write(self.fd, json.dumps(event, sort_keys=True).encode("utf-8") + b"\n")
+
+    def close(self):
+        os.close(self.fd)
+
+
+_stream = None
+_lock = threading.Lock()
+
+
+def configure(path):
+    """Record events to the given file in this process and its children.
+
+    Args:
+        path (str): The path to the events file or ``None`` to stop recording
+            events.
+    """
+
+    global _stream
+
+    with _lock:
+        if _stream is not None:
+            _stream.close()
+            _stream = None
+
+    if path is None:
+        os.environ.pop(EVENTS_ENVIRONMENT_VARIABLE, None)
+    else:
+        # Child processes (e.g., ``parse-many`` workers) pick this up.
+        os.environ[EVENTS_ENVIRONMENT_VARIABLE] = os.path.abspath(path)
+
+
+def stream():
+    """The events stream of this process.
+
+    Returns:
+        A ``Stream`` for the file named by ``BLIND_HELIX_EVENTS`` or ``None`` if
+        events are not recorded.
+    """
+
+    global _stream
+
+    path = os.environ.get(EVENTS_ENVIRONMENT_VARIABLE)
+
+    if not path:
+        return None
+
+    # Build threads (see ``utils.imap()``) record events at the same time.
+    with _lock:
+        if _stream is None or _stream.path != path:
+            if _stream is not None:
+                _stream.close()
+
+            _stream = Stream(path)
+
+        return _stream
+
+
+@contextlib.contextmanager
+def span(phase, library, function=None):
+    """Time a block of code and record it as an event.
+
+    The block succeeds unless it raises an exception. It may override this by
+    setting ``outcome`` and ``error`` in the dictionary this yields - e.g., to
+    record the known error class of a failed build rather than the exception
+    raised for it.
+
+    This does nothing if events are not recorded.
+
+    Args:
+        phase (str): One of ``PHASES``.
+        library (str): The library name.
+        function (str): The function name, if any.
+    """
+
+    event = {"outcome": None, "error": None}
+
+    events = stream()
+
+    if events is None:
+        yield event
+        return
+
+    start = time.time()
+
+    try:
+        yield event
+    except BaseException as e:
+        events.record(
+            phase,
+            library,
+            function,
+            start=start,
+            end=time.time(),
+            outcome=FAILED,
+            error=event["error"] or type(e).__name__,
+        )
+        raise
+
+    events.record(
+        phase,
+        library,
+        function,
+        start=start,
+        end=time.time(),
+        outcome=event["outcome"] or (FAILED if event["error"] else SUCCEEDED),
+        error=event["error"],
+    )
+
+
+def load(path):
+    """Read the events recorded to a file.
+
+    Args:
+        path (str): The path to the events file.
+
+    Returns:
+        A list of events, as dictionaries (see ``Stream.record()``).
+    """
+
+    with open(path, "rb") as f:
+        content = f.read()
+
+    events = []
+
+    for line in content.splitlines():
+        try:
+            event = json.loads(line.decode("utf-8"))
+        except ValueError:
+            # A partially written event from an interrupted run.
+            continue
+
+        events.append(event)
+
+    return events
+
+
+def percentile(values, p):
+    """The ``p``-th percentile of some values (nearest rank)."""
+
+    values = sorted(values)
+
+    return values[max(math.ceil(p / 100 * len(values)) - 1, 0)]
+
+
+def summarize(events, top=10):
+    """Summarize a list of events.
+
+    Args:
+        events (list): Events read with ``load()``.
+        top (int): The number of slowest functions to include.
+
+    Returns:
+        A dictionary with the ``elapsed`` time between the first and last
+        event, the number of ``libraries`` and ``functions``, the throughput
+        in ``rate`` (functions per hour), ``phases`` (a dictionary of
+        ``count``, ``failed``, ``total``, ``p50`` and ``p95`` by phase) and
+        the ``slowest`` functions (a list of ``(library, function, total,
+        durations by phase)`` tuples).
+    """
+
+    events = [e for e in events if e.get("start") is not None and e.get("end")]
+
+    if not events:
+        return None
+
+    elapsed = max(e["end"] for e in events) - min(e["start"] for e in events)
+
+    durations = {}
+    failures = {}
+    functions = {}
+
+    for e in events:
+        duration = e["end"] - e["start"]
+
+        durations.setdefault(e["phase"], []).append(duration)
+
+        if e["outcome"] == FAILED:
+            failures[e["phase"]] = failures.get(e["phase"], 0) + 1
+
+        if e["function"] is not None:
+            phases = functions.setdefault((e["library"], e["function"]), {})
+            phases[e["phase"]] = phases.get(e["phase"], 0) + duration
+
+    order = list(PHASES) + sorted(set(durations) - set(PHASES))
+
+    phases = {}
+
+    for phase in order:
+        if phase not in durations:
+            continue
+
+        phases[phase] = {
+            "count": len(durations[phase]),
+            "failed": failures.get(phase, 0),
+            "total": sum(durations[phase]),
+            "p50": percentile(durations[phase], 50),
+            "p95": percentile(durations[phase], 95),
+        }
+
+    slowest = sorted(
+        (
+            (library, function, sum(p.values()), p)
+            for (library, function), p in functions.items()
+        ),
+        key=lambda f: -f[2],
+    )[:top]
+
+    return {
+        "elapsed": elapsed,
+        "libraries": len(set(e["library"] for e in events)),
+        "functions": len(functions),
+        "rate": len(functions) / elapsed * 3600 if elapsed else 0.0,
+        "phases": phases,
+        "slowest": slowest,
+    }
+
+
+__all__ = [
+    "Stream",
+    "configure",
+    "stream",
+    "span",
+    "load",
+    "summarize",
+    "PHASES",
+]
@@ -6,6 +6,10 @@ class LibraryNotFound(BlindHELIXException):
     """Raised when a given library cannot be found."""
 
 
+class ComponentNotFound(BlindHELIXException):
+    """Raised when a given Component is not part of a Library."""
+
+
 class UnexpectedBuildFailure(BlindHELIXException):
     """Raised when a build fails in an unexpected way."""
 
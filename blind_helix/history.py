@@ -0,0 +1,144 @@
+import os
+import json
+import statistics
+
+TIMING = "timing.json"
+"""The name of the file in a library's output directory recording its cost."""
+
+SYMBOL_SIZE = 1024
+"""The assumed number of archive bytes per symbol when the archive has no
+symbol table."""
+
+
+def weight(size, symbols=None):
+    """Estimate the relative cost of testing a library.
+
+    Every exported function is built as a separate Component and every build
+    links against the library, so the cost is modelled as the number of
+    symbols scaled by the size of the library file.
+
+    Args:
+        size (int): The size of the library file in bytes.
+        symbols (int): The number of symbols in the library's symbol table -
+            if this is not known it is estimated from ``size``.
+
+    Returns:
+        A positive number - only meaningful relative to other weights.
+    """
+
+    if symbols is None:
+        symbols = size / SYMBOL_SIZE
+
+    return max(symbols, 1) * (1 + size / (1024 * 1024))
+
+
+def read(path):
+    """Read the timing record of a library.
+
+    Args:
+        path (str): The library's output directory.
+
+    Returns:
+        The record written by ``write()`` or ``None``.
+    """
+
+    try:
+        with open(os.path.join(path, TIMING), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write(path, record):
+    """Write the timing record of a library.
+
+    Args:
+        path (str): The library's output directory.
+        record (dict): The record - see ``History``.
+    """
+
+    with open(os.path.join(path, TIMING), "w") as f:
+        json.dump(record, f, indent=2, sort_keys=True)
+
+
+class History:
+    """The durations of libraries parsed previously.
+
+    Every library's output directory may contain a timing record with the
+    library's ``weight`` (see ``weight()``), the time spent parsing and
+    testing it (``duration``, in worker-seconds), and the number of its
+    ``functions`` of which ``tested`` were tested in that run (the others
+    having been resumed from a journal). It also records the total ``usage``
+    of every journaled build of the library (see ``utils.Usage``) - with the
+    largest peak memory of any build - and the function whose build used the
+    most memory (``peak``).
+
+    Durations are used to estimate the cost of parsing libraries again or, for
+    libraries without a record, to convert weights into seconds. The largest
+    peak memory of any build of each library is kept in ``peaks`` (in bytes).
+
+    Args:
+        working (str): The output directory.
+    """
+
+    RATE = 1.0
+    """The seconds per unit of weight assumed without any history."""
+
+    def __init__(self, working):
+        self.records = {}
+        self.peaks = {}
+
+        try:
+            names = os.listdir(working)
+        except FileNotFoundError:
+            names = []
+
+        for name in names:
+            record = read(os.path.join(working, name))
+
+            if record is None:
+                continue
+
+            usage = record.get("usage") or {}
+
+            if usage.get("memory"):
+                self.peaks[name] = usage["memory"]
+
+            if not record.get("duration"):
+                continue
+
+            if not record.get("weight") or not record.get("tested"):
+                continue
+
+            self.records[name] = record
+
+        rates = [self.duration(r) / r["weight"] for r in self.records.values()]
+
+        self.rate = statistics.median(rates) if rates else self.RATE
+
+    @staticmethod
+    def duration(record):
+        """The duration of parsing and testing every function in a library."""
+
+        return record["duration"] * record["functions"] / record["tested"]
+
+    def estimate(self, library, weight):
+        """Estimate the duration of parsing and testing a library.
+
+        Args:
+            library (str): The library name.
+            weight (float): The library's weight (see ``weight()``).
+
+        Returns:
+            The estimated duration in seconds.
+        """
+
+        record = self.records.get(library)
+
+        if record is not None:
+            return self.duration(record) * weight / record["weight"]
+
+        return self.rate * weight
+
+
+__all__ = ["weight", "read", "write", "History"]
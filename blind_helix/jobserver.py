@@ -0,0 +1,201 @@
+import os
+import select
+import shutil
+import tempfile
+import threading
+
+JOBSERVER_ENVIRONMENT_VARIABLE = "BLIND_HELIX_JOBSERVER"
+
+TOKEN = b"+"
+"""The token written to the jobserver (any byte will do)."""
+
+
+class Jobserver:
+    """A GNU make compatible jobserver.
+
+    The jobserver is a named pipe holding one token per process that may run
+    at once. Every command run with ``utils.run()`` while the jobserver is
+    configured (see ``configure()``) - in this process or any process started
+    from it - takes a token before it starts and returns it once it exits.
+    ``make`` (and so CMake builds with the Unix Makefiles generator) and
+    ``-flto=jobserver`` links started by the command take their additional
+    parallel jobs from the same pipe, so the number of compiler and linker
+    processes is capped across every worker.
+
+    Args:
+        tokens (int): The maximum number of processes that may run at once.
+
+    Note:
+        A process that is killed while holding a token does not return it, as
+        with ``make``. Since the tokens ``make`` takes cannot be told apart,
+        commands that ``utils.run()`` may kill (those with an ``abort``
+        function or a timeout) only take their own token and do not share the
+        jobserver with ``make``, so that killing them cannot shrink the pool.
+        In practice only ``engines.BatchEngine`` builds share it - every
+        other engine may stop its builds early.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+        self.directory = tempfile.mkdtemp(prefix="blind-helix-jobserver-")
+        self.path = os.path.join(self.directory, "jobserver")
+
+        os.mkfifo(self.path, 0o600)
+
+        # Held open so that the tokens in the pipe outlive the processes that
+        # take and return them.
+        self.fd = os.open(self.path, os.O_RDWR)
+
+        os.write(self.fd, TOKEN * tokens)
+
+    def close(self):
+        os.close(self.fd)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class Slot:
+    """A token taken from a jobserver (see ``Client.acquire()``).
+
+    Attributes:
+        environment (dict): The environment for the command using the token,
+            which lets ``make`` join the jobserver - or ``None`` if the
+            jobserver is not shared.
+        descriptors (tuple): The file descriptors that must be passed to the
+            command (see ``subprocess.Popen``'s ``pass_fds``).
+    """
+
+    def __init__(self, client, token, shared=True):
+        self.client = client
+        self.token = token
+
+        self.descriptors = ()
+        self.environment = None
+
+        if not shared:
+            return
+
+        # A separate file description for the command, so that any flags
+        # ``make`` sets on it do not affect this process.
+        read = os.open(client.path, os.O_RDWR)
+        write = os.open(client.path, os.O_RDWR)
+
+        self.descriptors = (read, write)
+
+        environment = dict(os.environ)
+        environment["MAKEFLAGS"] = " -j --jobserver-auth={},{}".format(read, write)
+
+        self.environment = environment
+
+    def release(self):
+        """Return the token once the command has exited."""
+
+        if self.token is None:
+            return
+
+        for fd in self.descriptors:
+            os.close(fd)
+
+        self.client.release(self.token)
+        self.token = None
+
+
+class Client:
+    """A client of a jobserver.
+
+    Args:
+        path (str): The path to the jobserver's named pipe.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR)
+
+    def acquire(self, shared=True):
+        """Take a token, waiting until one is available.
+
+        Args:
+            shared (bool): If ``True``, the command using the token may take
+                additional tokens (i.e., ``make`` joins the jobserver). This
+                must be ``False`` for commands that may be killed - their
+                additional tokens would be lost. Default: ``True``.
+
+        Returns:
+            A ``Slot`` that must be released once the command using it exits.
+        """
+
+        while True:
+            try:
+                token = os.read(self.fd, 1)
+            except BlockingIOError:
+                select.select([self.fd], [], [])
+                continue
+
+            if token:
+                return Slot(self, token, shared=shared)
+
+    def release(self, token):
+        os.write(self.fd, token)
+
+    def close(self):
+        os.close(self.fd)
+
+
+_client = None
+_lock = threading.Lock()
+
+
+def configure(path):
+    """Use a jobserver in this process and its children.
+
+    Args:
+        path (str): The path to the jobserver's named pipe (see
+            ``Jobserver.path``) or ``None`` to stop using a jobserver.
+    """
+
+    global _client
+
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+    if path is None:
+        os.environ.pop(JOBSERVER_ENVIRONMENT_VARIABLE, None)
+    else:
+        # Child processes (e.g., ``parse-many`` workers) pick this up.
+        os.environ[JOBSERVER_ENVIRONMENT_VARIABLE] = os.path.abspath(path)
+
+
+def client():
+    """The jobserver client of this process.
+
+    Returns:
+        A ``Client`` for the jobserver named by ``BLIND_HELIX_JOBSERVER`` or
+        ``None`` if there is no jobserver.
+    """
+
+    global _client
+
+    path = os.environ.get(JOBSERVER_ENVIRONMENT_VARIABLE)
+
+    if not path:
+        return None
+
+    with _lock:
+        if _client is None or _client.path != path:
+            if _client is not None:
+                _client.close()
+
+            _client = Client(path)
+
+        return _client
+
+
+__all__ = ["Jobserver", "Client", "configure", "client"]
@@ -0,0 +1,113 @@
+import os
+import json
+
+
+class Journal:
+    """A durable, append-only record of Component build results.
+
+    Every result is written to a JSON lines file (one result per line) and
+    flushed to disk before the next build is recorded, so a test run that is
+    interrupted can be resumed from the journal without repeating any of the
+    builds it already completed. Results are keyed by the digest of the
+    library file and the function name, like the ``BuildCache``, which this
+    class is interchangeable with.
+
+    Args:
+        path (str): The path to the journal file. It is created if it does not
+            exist, otherwise the results it contains are loaded. If this is
+            ``None`` results are only kept in memory (e.g., to collect the
+            results of a test run and send them to another process).
+
+    Note:
+        Unlike the ``BuildCache``, a journal records every result of a run -
+        including transient failures (see ``errors``) and results taken from
+        the cache or predicted by static analysis - and is not meant to be
+        shared by concurrent processes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.results = {}
+
+        content = b""
+
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                pass
+
+        for line in content.splitlines():
+            try:
+                record = json.loads(line.decode("utf-8"))
+                key = (record["library"], record["function"])
+                result = {k: record[k] for k in ("succeeded", "error", "included")}
+                result["usage"] = record.get("usage")
+            except (ValueError, KeyError, TypeError):
+                # A partially written record from an interrupted run.
+                continue
+
+            self.results[key] = result
+
+        self.file = None
+
+        if path is not None:
+            self.file = open(path, "ab")
+
+            if content and not content.endswith(b"\n"):
+                self.file.write(b"\n")
+
+    def get(self, library, function):
+        """Fetch a recorded build result.
+
+        Args:
+            library (str): The library file digest.
+            function (str): The function name.
+
+        Returns:
+            A dictionary with ``succeeded``, ``error`` and ``included`` fields
+            (see ``BuildCache.get()``) and ``usage`` (see ``put()``) if there
+            is a recorded result, otherwise ``None``.
+        """
+
+        return self.results.get((library, function))
+
+    def put(self, library, function, succeeded, error=None, included=None, usage=None):
+        """Record a build result.
+
+        The result is on disk when this returns (unless this journal is kept
+        in memory).
+
+        Args:
+            library (str): The library file digest.
+            function (str): The function name.
+            succeeded (bool): If the build succeeded.
+            error (str): The name of the known error class if the build failed.
+            included (list): An optional list of included function names.
+            usage (dict): The resources used by the build, if it was built
+                by this run (see ``utils.Usage.todict()``).
+        """
+
+        result = {
+            "succeeded": succeeded,
+            "error": error,
+            "included": included,
+            "usage": usage,
+        }
+
+        if self.file is not None:
+            record = dict(result, library=library, function=function)
+
+            self.file.write(json.dumps(record, sort_keys=True).encode("utf-8") + b"\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+        self.results[(library, function)] = result
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+__all__ = ["Journal"]
@@ -3,14 +3,17 @@ import os
 import abc
 import json
 import logging
+import hashlib
 import tempfile
 from datetime import datetime
 import base64
 
 from helix import component as helix_component
-from helix import exceptions as helix_exceptions
 
+from . import cache
 from . import component
+from . import container
+from . import engines
 from . import errors
 from . import exceptions
 from . import utils
@@ -58,8 +61,8 @@ def build(name, library, functions, included=None, version=None, date=None):
 class Library(metaclass=abc.ABCMeta):
     """A collection of Components encapsulated in a portable class.
 
-    Libraries are made portable by storing required files as strings in the
-    class itself that can be rewritten to disk as necessary.
+    Libraries are made portable by storing required files in the class itself
+    so that they can be rewritten to disk as necessary.
     """
 
     @property
@@ -80,7 +83,13 @@ class Library(metaclass=abc.ABCMeta):
     @property
     @abc.abstractmethod
     def library(self):
-        return ""
+        """The content of the library file.
+
+        This is either the raw ``bytes`` of the file or, for Libraries loaded
+        from the legacy JSON format, a base64 encoded string.
+        """
+
+        return b""
 
     @property
     @abc.abstractmethod
@@ -101,8 +110,9 @@ class Library(metaclass=abc.ABCMeta):
         """Generates a tempfile with the given content.
 
         Args:
-            content (str): Content to be written to the tempfile - typically
-                generated with ``read()``.
+            content (bytes): Content to be written to the tempfile - typically
+                generated with ``read()``. Base64 encoded strings are also
+                supported.
             filename (str): Optional file name to write to if you don't want a
                 temporary file.
 
@@ -110,7 +120,8 @@ class Library(metaclass=abc.ABCMeta):
             A tempfile with the given content.
         """
 
-        content = base64.b64decode(content)
+        if isinstance(content, str):
+            content = base64.b64decode(content)
 
         if filename:
             generated = open(filename, "w+b")
@@ -132,9 +143,8 @@ class Library(metaclass=abc.ABCMeta):
             path (str): The full path to the file from which to read.
 
         Returns:
-            A string representation of the content of the given file - this is
-            typically to be used with ``write()`` to reconstitute the file
-            later.
+            The content of the given file - this is typically to be used with
+            ``write()`` to reconstitute the file later.
         """
 
         path = os.path.abspath(os.path.expanduser(path))
@@ -142,12 +152,118 @@ class Library(metaclass=abc.ABCMeta):
         with open(path, "rb") as f:
             content = f.read()
 
-        content = base64.b64encode(content).decode("utf-8")
-
         return content
 
+    _digest = None
+
     def __init__(self):
-        self._library = self.write(self.library)
+        # Only decoded if the digest is unknown or the file is not cached yet.
+        content = self._content
+
+        if type(self)._digest is None:
+            content = content()
+            type(self)._digest = hashlib.sha256(content).hexdigest()
+
+        self._library = cache.ExtractionCache().extract(content, digest=self.digest)
+
+        self._components = {}
+        self._functions = None
+
+    @property
+    def digest(self):
+        """A SHA-256 hex digest of the library file content."""
+
+        return self._digest
+
+    def _component(self, _function):
+        """Generates the Component class for a single function."""
+
+        _included = self.included.get(_function, [])
+
+        tags = [
+            ("function", "{}-{}".format(self.name, f)) for f in _included + [_function]
+        ]
+        tags.append(("library", self.name))
+        tags.append(("type", "library-slice"))
+        _tags = set(tags)
+
+        class Component(component.LibrarySliceComponent):
+            name = "{}-{}".format(self.name, _function)
+            verbose_name = name
+            version = self.version
+            description = "The {} function from the {} library.".format(
+                _function, self.name
+            )
+            date = self.date
+            tags = _tags
+
+            library = self.name
+            path = self._library.name
+            _library = self._library
+            function = _function
+            included = _included
+
+        Component.__name__ = "{}{}{}".format(
+            self.name, _function.title().replace("_", ""), Component.__name__
+        )
+
+        return Component
+
+    def by_function(self, function):
+        """Fetch the Component class for a given function.
+
+        Component classes are generated on first use and reused afterwards.
+
+        Args:
+            function (str): The name of a function in this Library.
+
+        Returns:
+            The Component class for ``function``.
+        """
+
+        if function not in self._components:
+            if self._functions is None:
+                self._functions = set(self.functions)
+
+            if function not in self._functions:
+                raise exceptions.ComponentNotFound(
+                    "{} is not a function in the {} library".format(function, self.name)
+                )
+
+            self._components[function] = self._component(function)
+
+        return self._components[function]
+
+    def by_name(self, name):
+        """Fetch a Component class by its Component name.
+
+        Args:
+            name (str): The name of a Component in this Library.
+
+        Returns:
+            The Component class named ``name``.
+        """
+
+        prefix = "{}-".format(self.name)
+
+        try:
+            if not name.startswith(prefix):
+                raise exceptions.ComponentNotFound()
+
+            return self.by_function(name[len(prefix) :])
+        except exceptions.ComponentNotFound:
+            raise exceptions.ComponentNotFound(
+                "{} is not a Component in the {} library".format(name, self.name)
+            )
+
+    def __iter__(self):
+        """Iterate over the Component classes for this Library.
+
+        Component classes are generated on demand, in ``functions`` order.
+        """
+
+        for function in self.functions:
+            yield self.by_function(function)
 
     @property
     def components(self):
@@ -158,50 +274,69 @@ class Library(metaclass=abc.ABCMeta):
             library.
         """
 
-        components = []
+        return list(self)
 
-        for _function in self.functions:
+    def subset(self, functions, included=None):
+        """Create a Library with only some of the functions in this Library.
 
-            _included = self.included.get(_function, [])
+        Args:
+            functions (list): The functions to keep.
+            included (dict): An optional mapping of function names to included
+                functions - by default the mapping of this Library is kept.
 
-            tags = [
-                ("function", "{}-{}".format(self.name, f))
-                for f in _included + [_function]
-            ]
-            tags.append(("library", self.name))
-            tags.append(("type", "library-slice"))
-            _tags = set(tags)
+        Returns:
+            A new Library sharing the library file of this Library.
+        """
 
-            class Component(component.LibrarySliceComponent):
-                name = "{}-{}".format(self.name, _function)
-                verbose_name = name
-                version = self.version
-                description = "The {} function from the {} library.".format(
-                    _function, self.name
-                )
-                date = self.date
-                tags = _tags
+        _functions = functions
+        _included = dict(included) if included is not None else {}
 
-                library = self.name
-                path = self._library.name
-                _library = self._library
-                function = _function
-                included = _included
+        for function in functions:
+            if function not in _included and function in self.included:
+                _included[function] = self.included[function]
 
-            Component.__name__ = "{}{}{}".format(
-                self.name, _function.title().replace("_", ""), Component.__name__
-            )
+        class LibraryInstance(Library):
+            name = self.name
+            version = self.version
+            date = self.date
+
+            library = self.library
+            functions = _functions
+            included = _included
+
+            _digest = self.digest
 
-            components.append(Component)
+        LibraryInstance.__name__ = self.__class__.__name__
 
-        return components
+        return LibraryInstance
 
-    def test(self, callback=None):
+    def test(
+        self, callback=None, jobs=1, cache=None, predict=None, engine=None, journal=None
+    ):
         """Tests all of the functions in this Library.
 
         Args:
             callback (function): An optional function called with the path to
                 each successfully built Component's name and build artifact(s).
+                If it returns a value, that is used as the list of functions
+                included in that Component.
+            jobs (int): The number of Components to build in parallel -
+                default: 1.
+            cache (BuildCache): An optional build result cache. Functions with
+                a cached result are not rebuilt (and ``callback`` is not called
+                for them) and new results are added to the cache.
+            predict (function): An optional function called with each
+                function name before it is built. If it returns a known error
+                class (see ``errors``) the function is assumed to fail with
+                that error and is not built.
+            engine (Engine): The engine used to build Components - default:
+                a ``SingleEngine``.
+            journal (Journal): An optional journal of the results of this
+                run. Functions with a result in the journal (e.g., from an
+                interrupted run) are not tested again, unless they failed
+                transiently (see ``errors``), and every new result is
+                recorded in the journal as soon as it is known, with the
+                resources used by its build (see ``utils.Usage``).
 
         Returns:
             A new Library consisting of only functions that successfully built
@@ -209,125 +344,289 @@ class Library(metaclass=abc.ABCMeta):
 
         Note:
             This function can take a long time - status updates are logged to
-            the standard python logger.
+            the standard python logger. Status updates, build output, and calls
+            to ``callback`` happen in order, from the calling thread,
+            regardless of ``jobs``.
         """
 
         success = []
+        _included = {}
         components = self.components
 
-        for i, c in enumerate(components):
+        resumed = {}
+        if journal:
+            for c in components:
+                result = journal.get(self.digest, c.function)
+
+                # Transient failures (e.g., timeouts) are retried, as with
+                # the cache.
+                if result is not None and not errors.transient(result["error"]):
+                    resumed[c.function] = result
+
+        cached = {}
+        if cache:
+            for c in components:
+                if c.function in resumed:
+                    continue
+
+                result = cache.get(self.digest, c.function)
+
+                if result is not None:
+                    cached[c.function] = result
+
+        predicted = {}
+        if predict:
+            for c in components:
+                if c.function in resumed or c.function in cached:
+                    continue
+
+                error = predict(c.function)
+
+                if error is not None:
+                    predicted[c.function] = error
+
+        engine = engine or engines.SingleEngine()
+
+        results = engine.build(
+            [
+                c
+                for c in components
+                if c.function not in resumed
+                and c.function not in cached
+                and c.function not in predicted
+            ],
+            jobs=jobs,
+        )
 
-            def status(message, level=logging.DEBUG):
-                logger.log(
-                    level,
-                    "({}/{}) {}:{} {} ".format(
-                        utils.color(i + 1, utils.COLOR.LIGHT_GREY, stream=logger),
-                        utils.color(
-                            len(components), utils.COLOR.LIGHT_GREY, stream=logger
+        try:
+            for i, c in enumerate(components):
+
+                def status(message, level=logging.DEBUG):
+                    logger.log(
+                        level,
+                        "({}/{}) {}:{} {} ".format(
+                            utils.color(i + 1, utils.COLOR.LIGHT_GREY, stream=logger),
+                            utils.color(
+                                len(components), utils.COLOR.LIGHT_GREY, stream=logger
+                            ),
+                            utils.color(c.library, utils.COLOR.BOLD, stream=logger),
+                            c.function,
+                            message,
                         ),
-                        utils.color(c.library, utils.COLOR.BOLD, stream=logger),
-                        c.function,
-                        message,
-                    ),
-                )
+                    )
 
-            options = {"stdout": io.BytesIO(), "stderr": io.BytesIO()}
+                usage = None
 
-            try:
-                succeeded = True
-                working, artifacts = c.test(**options)
-            except helix_exceptions.BuildFailure:
-                succeeded = False
-                options["stderr"].seek(0)
-                stderr = options["stderr"].read().decode("utf-8").strip("\n")
+                if c.function in predicted:
+                    succeeded = False
+                    error = predicted[c.function].__name__
+                    suffix = " {}".format(
+                        utils.color(
+                            "(predicted: {})".format(error),
+                            utils.COLOR.GREY,
+                            stream=logger,
+                        )
+                    )
+                elif c.function in resumed or c.function in cached:
+                    if c.function in resumed:
+                        result, source = resumed[c.function], "resumed"
+                    else:
+                        result, source = cached[c.function], "cached"
+
+                    succeeded = result["succeeded"]
+                    error = result["error"]
+
+                    if succeeded and result["included"] is not None:
+                        _included[c.function] = result["included"]
 
-                if not errors.known(stderr):
-                    raise exceptions.UnexpectedBuildFailure(
-                        "build failed in an unexpected way", errors=stderr
+                    suffix = " {}".format(
+                        utils.color(
+                            "({})".format(source), utils.COLOR.GREY, stream=logger
+                        )
+                    )
+                else:
+                    working, artifacts, stdout, stderr, usage = next(results)
+                    succeeded = working is not None
+                    suffix = ""
+
+                    if usage is not None:
+                        logger.debug(
+                            utils.color(
+                                "cpu: {:.2f}s, memory: {} MiB, written: {} KiB".format(
+                                    usage.user + usage.system,
+                                    usage.memory // (1024 * 1024),
+                                    usage.written // 1024,
+                                ),
+                                utils.COLOR.GREY,
+                                stream=logger,
+                            )
+                        )
+
+                    if stdout:
+                        logger.debug(
+                            utils.color(stdout, utils.COLOR.GREY, stream=logger)
+                        )
+                    if stderr:
+                        logger.debug(
+                            utils.color(stderr, utils.COLOR.GREY, stream=logger)
+                        )
+
+                    known = None
+                    if not succeeded:
+                        known = errors.classify(stderr)
+
+                        if known is None:
+                            raise exceptions.UnexpectedBuildFailure(
+                                "build failed in an unexpected way", errors=stderr
+                            )
+
+                        suffix = " {}".format(
+                            utils.color(
+                                "({})".format(known.__name__),
+                                utils.COLOR.GREY,
+                                stream=logger,
+                            )
+                        )
+
+                    if succeeded:
+                        try:
+                            if callback:
+                                functions = callback(c.function, artifacts)
+
+                                if functions is not None:
+                                    _included[c.function] = functions
+                        finally:
+                            working.cleanup()
+
+                    error = known.__name__ if known else None
+
+                    if cache and not (known and known.transient):
+                        cache.put(
+                            self.digest,
+                            c.function,
+                            succeeded,
+                            error=error,
+                            included=_included.get(c.function),
+                        )
+
+                if journal and c.function not in resumed:
+                    journal.put(
+                        self.digest,
+                        c.function,
+                        succeeded,
+                        error=error,
+                        included=_included.get(c.function),
+                        usage=usage.todict() if usage is not None else None,
                     )
-            finally:
-                options["stdout"].seek(0)
-                options["stderr"].seek(0)
-
-                stdout = options["stdout"].read().decode("utf-8").strip("\n")
-                stderr = options["stderr"].read().decode("utf-8").strip("\n")
-
-                if stdout:
-                    logger.debug(utils.color(stdout, utils.COLOR.GREY, stream=logger))
-                if stderr:
-                    logger.debug(utils.color(stderr, utils.COLOR.GREY, stream=logger))
-
-            if succeeded:
-                if callback:
-                    callback(c.function, artifacts)
-
-                success.append(c.function)
-                status(
-                    utils.color("✓", utils.COLOR.GREEN, stream=logger),
-                    level=logging.INFO,
-                )
-            else:
-                status(
-                    utils.color("✗", utils.COLOR.RED, stream=logger), level=logging.INFO
-                )
 
-        class LibraryInstance(Library):
-            name = self.name
-            version = self.version
-            date = self.date
+                if succeeded:
+                    success.append(c.function)
+                    status(
+                        utils.color("✓", utils.COLOR.GREEN, stream=logger) + suffix,
+                        level=logging.INFO,
+                    )
+                else:
+                    status(
+                        utils.color("✗", utils.COLOR.RED, stream=logger) + suffix,
+                        level=logging.INFO,
+                    )
+        finally:
+            results.close()
 
-            library = self.library
-            functions = success
-            included = self.included
+        return self.subset(success, _included)
 
-        LibraryInstance.__name__ = self.__class__.__name__
+    @classmethod
+    def _metadata(cls):
+        return {
+            "name": cls.name,
+            "version": cls.version,
+            "date": cls.date,
+            "functions": cls.functions,
+            "included": cls.included,
+        }
 
-        return LibraryInstance
+    @classmethod
+    def _content(cls):
+        if isinstance(cls.library, str):
+            return base64.b64decode(cls.library)
+
+        return cls.library
 
     @classmethod
     def saves(cls):
-        """Save this Library to a string.
+        """Save this Library to a string in the legacy JSON format.
 
         Returns:
             A string serialized version of this class which can be loaded with
             ``loads()``.
         """
 
-        return json.dumps(
-            {
-                "name": cls.name,
-                "version": cls.version,
-                "date": cls.date,
-                "library": cls.library,
-                "functions": cls.functions,
-                "included": cls.included,
-            }
-        )
+        data = cls._metadata()
+
+        library = cls.library
+        if not isinstance(library, str):
+            library = base64.b64encode(library).decode("utf-8")
+
+        data["library"] = library
+
+        return json.dumps(data)
 
     @classmethod
-    def save(cls, f):
+    def dumps(cls, compression=container.COMPRESSION_ZLIB):
+        """Save this Library to bytes in the binary container format.
+
+        Args:
+            compression (str): The library file compression method - see
+                ``container.COMPRESSION``.
+
+        Returns:
+            A binary serialized version of this class which can be loaded with
+            ``loads()``.
+        """
+
+        return container.dumps(cls._metadata(), cls._content(), compression=compression)
+
+    @classmethod
+    def save(cls, f, compression=container.COMPRESSION_ZLIB):
         """Save this Library to a file.
 
+        Files opened in binary mode are written in the binary container format
+        and files opened in text mode are written in the legacy JSON format.
+
         Args:
             f (file): An open file-like object to which this class should be
                 written which can be read with ``load()``.
+            compression (str): The library file compression method for the
+                binary container format - see ``container.COMPRESSION``.
         """
 
-        f.write(cls.saves())
+        if isinstance(f, io.TextIOBase):
+            f.write(cls.saves())
+        else:
+            container.dump(cls._metadata(), cls._content(), f, compression=compression)
 
     @staticmethod
     def loads(string):
         """Load a Library from a string.
 
+        Both the binary container format and the legacy JSON format are
+        supported.
+
         Args:
-            library (str): A string representation of a Library generated with
-                ``saves()``.
+            library (bytes): A serialized Library generated with ``dumps()``
+                or ``saves()``.
 
         Returns:
             A Library class loaded from the given string.
         """
 
-        data = json.loads(string)
+        if isinstance(string, str):
+            data = json.loads(string)
+        elif container.detect(string):
+            data, library = container.loads(string)
+            data["library"] = library
+        else:
+            data = json.loads(bytes(string).decode("utf-8"))
 
         class LibraryInstance(Library):
             name = data["name"]
@@ -338,6 +637,8 @@ class Library(metaclass=abc.ABCMeta):
             functions = data["functions"]
             included = data["included"]
 
+            _digest = data.get("sha256")
+
         LibraryInstance.__name__ = "{}{}".format(
             data["name"].capitalize(), Library.__name__
         )
@@ -351,11 +652,16 @@ class Library(metaclass=abc.ABCMeta):
         Args:
             f (file): An open file-like object from which a Library should be
                 loaded. The library should have been saved with ``save()``.
+                Files in the binary container format must be opened in binary
+                mode unless they are regular files.
 
         Returns:
             A Library class loaded from the given file.
         """
 
+        if isinstance(f, io.TextIOBase) and hasattr(f, "buffer"):
+            f = f.buffer
+
         return Library.loads(f.read())
 
 
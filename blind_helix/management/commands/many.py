@@ -1,100 +1,650 @@
 import os
+import time
+import atexit
+import shutil
 import logging
+import collections
 import multiprocessing
 
+from concurrent import futures
+
 from helix.management import utils as management_utils
 
+from ... import cache
+from ... import errors
+from ... import events
+from ... import admission
+from ... import server
+from ... import history
+from ... import journal
+from ... import jobserver
+from ... import library as library_module
+from ... import parser as library_parser
 from ... import parsers
 from ... import utils
 from ... import exceptions
+from ...parsers import linux
+from ...parsers import archive
 
 from . import utils as command_utils
 
+STAGING = "analysis"
+"""The directory in a library's output directory where its analysis is kept.
 
-def initialize(lset):
-    global lock
-    lock = lset
+The analysis is shared by all of the workers that test the library's functions
+and is removed once the library is saved.
+"""
 
 
-def process(parser, library, working, level):
-    path = os.path.join(working, library)
+def initialize(cls, working, level, options):
+    """Set up a worker process.
 
-    if not os.path.isdir(path):
-        os.makedirs(path)
+    Args:
+        cls (class): The parser class.
+        working (str): The output directory.
+        level (int): The logging level.
+        options (dict): Parsing and testing options - ``cache``, ``backend``,
+            ``jobs``, ``predict``, ``build``, ``batch``, ``link``, ``server`` and
+            ``limits``.
+    """
 
-    if os.path.isfile(os.path.join(path, "succeeded")):
-        print(
-            "{} {} parsed previously".format(
-                utils.color(library, utils.COLOR.BOLD),
-                utils.color("✓", utils.COLOR.GREEN),
-            )
-        )
-        return
-    elif os.path.isfile(os.path.join(path, "failed")):
-        print(
-            "{} {} parsed previously".format(
-                utils.color(library, utils.COLOR.BOLD),
-                utils.color("✗", utils.COLOR.RED),
-            )
+    global parser, output, verbosity, settings
+
+    parser = cls
+    output = working
+    verbosity = level
+    settings = options
+
+
+build_cache = None
+build_engine = None
+
+PARSERS = 4
+"""The number of parsed libraries kept by each worker.
+
+Any worker may test functions from any library so it has to load a library's
+analysis the first time it runs one of its tasks - keeping a few of them
+avoids loading the same analyses over and over.
+"""
+
+parsed = collections.OrderedDict()
+
+
+def load(library):
+    """Fetch the parser and generated Library for a library in this worker.
+
+    The parser is created from the analysis saved by ``analyze()``.
+
+    Returns:
+        A tuple of the parser instance and the generated Library class.
+    """
+
+    if library in parsed:
+        parsed.move_to_end(library)
+    else:
+        analysis = library_parser.Analysis.load(os.path.join(output, library, STAGING))
+
+        instance = parser(
+            library,
+            analysis=analysis,
+            backend=settings["backend"],
+            jobs=settings["jobs"],
         )
-        return
 
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
+        parsed[library] = (instance, instance.build())
+
+        while len(parsed) > PARSERS:
+            parsed.popitem(last=False)
 
-    logfile = os.path.join(path, "{}.log".format(library))
+    return parsed[library]
 
-    command_utils.touch(logfile)
+
+def log(library):
+    """Send logging output to the log file of the given library."""
+
+    for handler in logging.root.handlers[:]:
+        logging.root.removeHandler(handler)
+        handler.close()
 
     logging.basicConfig(
         format="[%(levelname)s %(asctime)s %(process)d]: %(message)s",
-        filename=logfile,
-        level=level,
+        filename=os.path.join(output, library, "{}.log".format(library)),
+        level=verbosity,
     )
-    logger = logging.getLogger()
+
+    return logging.getLogger()
+
+
+def resolve(library):
+    """Locate a library file and measure it.
+
+    Returns:
+        A tuple of a dictionary with the ``path`` to the library file, its
+        ``size`` and the number of ``symbols`` in its symbol table (if it has
+        one) and ``None``, or ``None`` and an error message if the library
+        could not be found.
+    """
+
+    logger = log(library)
 
     try:
-        with lock:
-            parsed = parser(library)
+        instance = parser(library, backend=settings["backend"], jobs=settings["jobs"])
 
-        Library = parsed.build()
-        TestedLibrary = parsed.test(Library)
+        path = instance.path(library)
+        symbols = None
 
-        if len(TestedLibrary.functions) == 0:
-            raise exceptions.BlindHELIXException(
-                "found components in {} but none of them work".format(library)
-            )
+        if archive.is_archive(path):
+            with archive.Archive(path) as a:
+                table = a.symbols()
 
-        with open(os.path.join(path, "{}.bhlx".format(library)), "w") as f:
-            TestedLibrary.save(f)
+            if table is not None:
+                symbols = len(table)
+
+        return {"path": path, "size": os.path.getsize(path), "symbols": symbols}, None
     except exceptions.BlindHELIXException as e:
-        print(
-            "{} {} {}".format(
-                utils.color(library, utils.COLOR.BOLD),
-                utils.color("✗", utils.COLOR.RED),
-                e,
-            )
+        logger.critical(e)
+
+        return None, str(e)
+
+
+def analyze(library, path):
+    """Finalize and parse a library file and save the analysis.
+
+    Returns:
+        A tuple of the finalized library file digest and the list of functions
+        in the library, or ``None`` and an error message if the library could
+        not be parsed.
+    """
+
+    logger = log(library)
+
+    try:
+        instance = parser(
+            library, path=path, backend=settings["backend"], jobs=settings["jobs"]
         )
+
+        staging = os.path.join(output, library, STAGING)
+        shutil.rmtree(staging, ignore_errors=True)
+
+        instance.analyze().save(staging)
+
+        Library = instance.build()
+    except exceptions.BlindHELIXException as e:
         logger.critical(e)
 
-        command_utils.touch(os.path.join(path, "failed"))
-    else:
-        print(
-            "{} {} {}/{} ({})".format(
-                utils.color(library, utils.COLOR.BOLD),
-                utils.color("✓", utils.COLOR.GREEN),
-                len(TestedLibrary.functions),
-                len(Library.functions),
+        return None, str(e)
+
+    return Library().digest, Library.functions
+
+
+def test(library, functions):
+    """Test some of the functions of a library.
+
+    Returns:
+        A dictionary of build results (see ``BuildCache.get()``) by function
+        name, or ``None`` and an error message if testing failed.
+    """
+
+    global build_cache, build_engine
+
+    if build_engine is None:
+        # Engines and caches are shared by every task run by this worker
+        # (e.g., the stub of a ``LinkEngine`` is only compiled once).
+        build_cache = command_utils.cache(settings["cache"])
+        build_engine = command_utils.engine(
+            settings["batch"], settings["link"], settings["server"], settings["limits"]
+        )
+
+        atexit.register(build_engine.close)
+
+    logger = log(library)
+
+    try:
+        instance, Library = load(library)
+
+        generated = Library()
+
+        # Results are collected in memory and sent back to be journaled.
+        results = journal.Journal(None)
+
+        TestedLibrary = instance.test(
+            generated.subset(functions),
+            jobs=settings["jobs"],
+            cache=build_cache,
+            predict=settings["predict"],
+            build=settings["build"],
+            engine=build_engine,
+            journal=results,
+        )
+    except exceptions.BlindHELIXException as e:
+        logger.critical(e)
+
+        return None, str(e)
+
+    if settings["build"]:
+        return {f: results.get(generated.digest, f) for f in functions}, None
+
+    return (
+        {
+            f: {
+                "succeeded": f in TestedLibrary.functions,
+                "error": None,
+                "included": TestedLibrary.included.get(f),
+                "usage": None,
+            }
+            for f in functions
+        },
+        None,
+    )
+
+
+def save(library, path, functions, included):
+    """Save the tested Library.
+
+    Args:
+        library (str): The library name.
+        path (str): The library's output directory.
+        functions (list): The functions that were tested successfully.
+        included (dict): The included functions by function name.
+
+    Returns:
+        ``None`` or an error message if the Library could not be saved.
+    """
+
+    try:
+        TestedLibrary = library_module.build(
+            library,
+            os.path.join(path, STAGING, library_parser.Analysis.LIBRARY),
+            functions,
+            included=included,
+        )
+
+        with events.span(events.SAVE, library):
+            with open(os.path.join(path, "{}.bhlx".format(library)), "wb") as f:
+                TestedLibrary.save(f)
+    except exceptions.BlindHELIXException as e:
+        return str(e)
+
+    return None
+
+
+def report(library, succeeded, message):
+    print(
+        "{} {} {}".format(
+            utils.color(library, utils.COLOR.BOLD),
+            (
+                utils.color("✓", utils.COLOR.GREEN)
+                if succeeded
+                else utils.color("✗", utils.COLOR.RED)
+            ),
+            message,
+        )
+    )
+
+
+class State:
+    """The progress of a single library through the pipeline."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+
+        self.library = None
+        self.size = None
+        self.symbols = None
+        self.weight = None
+        self.estimate = None
+
+        self.digest = None
+        self.functions = []
+        self.results = {}
+        self.chunks = collections.deque()
+        self.outstanding = 0
+        self.tested = 0
+        self.elapsed = 0.0
+        self.journal = None
+        self.failed = False
+
+    def close(self):
+        if self.journal:
+            self.journal.close()
+
+        shutil.rmtree(os.path.join(self.path, STAGING), ignore_errors=True)
+
+        # A run resumed entirely from the journal says nothing about the
+        # library's duration - keep the record of the run that tested it.
+        if self.estimate is not None and (
+            self.tested or history.read(self.path) is None
+        ):
+            # Every build journaled for the library, including by earlier
+            # runs.
+            usage = utils.Usage()
+            peak = None
+
+            for function, result in sorted(self.results.items()):
+                if result.get("usage") is None:
+                    continue
+
+                build = utils.Usage.fromdict(result["usage"])
+
+                if peak is None or build.memory > usage.memory:
+                    peak = function
+
+                usage.add(build)
+
+            history.write(
+                self.path,
+                {
+                    "size": self.size,
+                    "symbols": self.symbols,
+                    "weight": self.weight,
+                    "estimate": self.estimate,
+                    "duration": self.elapsed,
+                    "functions": len(self.functions),
+                    "tested": self.tested,
+                    "failed": self.failed,
+                    "usage": usage.todict(),
+                    "peak": peak,
+                },
+            )
+
+    def fail(self, message):
+        self.failed = True
+        self.close()
+
+        report(self.name, False, message)
+        command_utils.touch(os.path.join(self.path, "failed"))
+
+    def succeed(self):
+        self.close()
+
+        success = len([r for r in self.results.values() if r["succeeded"]])
+
+        report(
+            self.name,
+            True,
+            "{}/{} ({})".format(
+                success,
+                len(self.functions),
                 utils.color(
-                    "{:.2%}".format(
-                        len(TestedLibrary.functions) / len(Library.functions)
-                    ),
-                    utils.COLOR.BOLD,
+                    "{:.2%}".format(success / len(self.functions)), utils.COLOR.BOLD
                 ),
+            ),
+        )
+        command_utils.touch(os.path.join(self.path, "succeeded"))
+
+
+RESOLVE = "resolve"
+ANALYZE = "analyze"
+TEST = "test"
+SAVE = "save"
+
+STAGES = (RESOLVE, ANALYZE, TEST, SAVE)
+
+POLL = 1.0
+"""The interval at which available memory is checked while test tasks are
+waiting for it, in seconds."""
+
+
+def schedule(stages, libraries, working, size, build, depth, jobs=1, budget=None):
+    """Parse and test libraries in a pipeline of stages.
+
+    Every library is located (``resolve``), finalized and parsed
+    (``analyze``), tested and saved by separate pools of workers, so
+    analyzing upcoming libraries overlaps with testing. At most ``depth``
+    analyzed libraries wait to be tested.
+
+    Every library is located before any is analyzed so that libraries can be
+    started in longest-expected-first order: the cost of each library is
+    estimated from the size and symbol table of its library file, calibrated
+    by the durations recorded in the output directory by previous runs (see
+    ``history.History``). The estimate and the actual duration of every
+    library are recorded in its output directory.
+
+    Libraries are tested in tasks of up to ``size`` functions, so every test
+    worker can test any library's functions and a single large library keeps
+    all of them busy. Libraries are saved as soon as their last task
+    completes.
+
+    Test tasks are only started while there is the memory for them (see
+    ``admission.Admission``), so the test workers are an upper bound on the
+    number of tasks running at once. The memory of each task is estimated
+    from the peak memory of the builds of its library - recorded by previous
+    runs and observed as its tasks complete.
+
+    Build results are journaled by this process as tasks complete, so an
+    interrupted run resumes where it left off.
+
+    Args:
+        stages (dict): A tuple of the executor and its number of workers for
+            each of ``STAGES``. The ``resolve``, ``analyze`` and ``test``
+            executors must be set up with ``initialize()``.
+        libraries (list): The library names.
+        working (str): The output directory.
+        size (int): The maximum number of functions per task.
+        build (bool): If build results should be journaled (``False`` when
+            relying on static analysis only).
+        depth (int): The maximum number of analyzed libraries waiting to be
+            tested.
+        jobs (int): The number of Components each task builds in parallel -
+            default: 1.
+        budget (int): The memory test tasks may use in total, in bytes -
+            default: the memory available when this starts (see
+            ``admission.Admission``).
+    """
+
+    durations = history.History(working)
+
+    # Builds (and their memory use) only happen when building.
+    memory = admission.Admission(durations.peaks, budget=budget) if build else None
+
+    unresolved = collections.deque()
+
+    for library in libraries:
+        path = os.path.join(working, library)
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        if os.path.isfile(os.path.join(path, "succeeded")):
+            report(library, True, "parsed previously")
+        elif os.path.isfile(os.path.join(path, "failed")):
+            report(library, False, "parsed previously")
+        else:
+            command_utils.touch(os.path.join(path, "{}.log".format(library)))
+            unresolved.append(State(library, path))
+
+    resolved = collections.deque()
+    ordered = False
+    tests = collections.deque()
+    saves = collections.deque()
+
+    pending = {}
+    running = collections.Counter()
+
+    def submit(stage, state, function, *arguments, chunk=None, reserved=None):
+        executor, _ = stages[stage]
+
+        # Tasks are only submitted to idle workers so this is (roughly) when
+        # they start.
+        started = time.monotonic()
+
+        pending[executor.submit(function, *arguments)] = (
+            state,
+            stage,
+            chunk,
+            started,
+            reserved,
+        )
+        running[stage] += 1
+
+    def available(stage):
+        return running[stage] < stages[stage][1]
+
+    def complete(state):
+        success = [f for f in state.functions if state.results[f]["succeeded"]]
+
+        if not success:
+            state.fail(
+                "found components in {} but none of them work".format(state.name)
             )
+            return
+
+        included = {
+            f: state.results[f]["included"]
+            for f in success
+            if state.results[f]["included"] is not None
+        }
+
+        saves.append((state, success, included))
+
+    while unresolved or resolved or tests or saves or pending:
+        # Later stages come first so that libraries are finished before new
+        # ones are started.
+        while saves and available(SAVE):
+            state, success, included = saves.popleft()
+            submit(SAVE, state, save, state.name, state.path, success, included)
+
+        deferred = False
+
+        while tests and available(TEST):
+            state = tests[0]
+
+            if state.failed or not state.chunks:
+                tests.popleft()
+                continue
+
+            reserved = None
+
+            if memory is not None:
+                builds = min(jobs, len(state.chunks[0]))
+                reserved = memory.admit(state.name, builds)
+
+                if reserved is None:
+                    # Not enough memory - try again once a task completes or
+                    # memory is freed.
+                    deferred = True
+                    break
+
+            chunk = state.chunks.popleft()
+
+            if not state.chunks:
+                tests.popleft()
+
+            submit(TEST, state, test, state.name, chunk, chunk=chunk, reserved=reserved)
+
+        located = not unresolved and not running[RESOLVE]
+
+        if located and not ordered:
+            resolved = collections.deque(
+                sorted(resolved, key=lambda s: (-s.estimate, s.name))
+            )
+            ordered = True
+
+        while located and resolved and available(ANALYZE) and len(tests) < depth:
+            state = resolved.popleft()
+            submit(ANALYZE, state, analyze, state.name, state.library)
+
+        while unresolved and available(RESOLVE):
+            state = unresolved.popleft()
+            submit(RESOLVE, state, resolve, state.name)
+
+        done, _ = futures.wait(
+            pending,
+            timeout=POLL if deferred else None,
+            return_when=futures.FIRST_COMPLETED,
         )
 
-        command_utils.touch(os.path.join(path, "succeeded"))
+        for future in done:
+            state, stage, chunk, started, reserved = pending.pop(future)
+            running[stage] -= 1
+
+            if reserved is not None:
+                memory.release(reserved)
+
+            if state.failed:
+                continue
+
+            if stage != RESOLVE:
+                state.elapsed += time.monotonic() - started
+
+            if stage == RESOLVE:
+                found, error = future.result()
+
+                if found is None:
+                    state.fail(error)
+                    continue
+
+                state.library = found["path"]
+                state.size = found["size"]
+                state.symbols = found["symbols"]
+                state.weight = history.weight(state.size, state.symbols)
+                state.estimate = durations.estimate(state.name, state.weight)
+
+                resolved.append(state)
+            elif stage == ANALYZE:
+                digest, functions = future.result()
+
+                if digest is None:
+                    state.fail(functions)
+                    continue
+
+                state.digest = digest
+                state.functions = functions
+                state.journal = command_utils.journal(
+                    os.path.join(state.path, "{}.journal".format(state.name))
+                )
+
+                remaining = []
+
+                for function in functions:
+                    result = state.journal.get(digest, function)
+
+                    # Transient failures (e.g., timeouts) are retried.
+                    if result is None or errors.transient(result["error"]):
+                        remaining.append(function)
+                    else:
+                        state.results[function] = result
+
+                for start in range(0, len(remaining), size):
+                    state.chunks.append(remaining[start : start + size])
+
+                state.outstanding = len(state.chunks)
+                state.tested = len(remaining)
+
+                if state.outstanding == 0:
+                    complete(state)
+                else:
+                    tests.append(state)
+            elif stage == TEST:
+                results, error = future.result()
+
+                if results is None:
+                    state.fail(error)
+                    continue
+
+                for function in chunk:
+                    result = results[function]
+
+                    if build:
+                        state.journal.put(state.digest, function, **result)
+
+                    if memory is not None and result.get("usage") is not None:
+                        memory.observe(state.name, result["usage"]["memory"])
+
+                    state.results[function] = result
+
+                state.outstanding -= 1
+
+                if state.outstanding == 0:
+                    complete(state)
+            else:
+                error = future.result()
+
+                if error is not None:
+                    state.fail(error)
+                else:
+                    state.succeed()
 
 
 class Command(management_utils.CommandBase):
@@ -137,7 +687,168 @@ class Command(management_utils.CommandBase):
             metavar="WORKERS",
             type=int,
             default=round(os.cpu_count() / 2),
-            help="number of parallel workers to use (default: <count(CPUs)/2>)",
+            help="maximum number of parallel workers testing Components - fewer run while memory is short (default: <count(CPUs)/2>)",
+        )
+
+        parser.add_argument(
+            "--jobserver",
+            metavar="TOKENS",
+            type=int,
+            nargs="?",
+            const=os.cpu_count(),
+            default=None,
+            help="share a GNU make jobserver between all workers and their builds, capping compiler and linker processes at TOKENS - every build takes one token and only --batch builds take more for their parallel jobs (default: <count(CPUs)>)",
+        )
+
+        parser.add_argument(
+            "-m",
+            "--memory-budget",
+            metavar="MIB",
+            type=int,
+            default=None,
+            help="memory that Component builds may use in total, in mebibytes (default: the memory available at start)",
+        )
+
+        parser.add_argument(
+            "--resolve-workers",
+            metavar="WORKERS",
+            type=int,
+            default=1,
+            help="number of parallel workers locating library files (default: 1)",
+        )
+
+        parser.add_argument(
+            "--analyze-workers",
+            metavar="WORKERS",
+            type=int,
+            default=1,
+            help="number of parallel workers finalizing and parsing library files (default: 1)",
+        )
+
+        parser.add_argument(
+            "--save-workers",
+            metavar="WORKERS",
+            type=int,
+            default=1,
+            help="number of parallel workers saving tested libraries (default: 1)",
+        )
+
+        parser.add_argument(
+            "-q",
+            "--queue-size",
+            metavar="LIBRARIES",
+            type=int,
+            default=2,
+            help="number of libraries parsed ahead of testing (default: 2)",
+        )
+
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help="number of parallel jobs used by each worker to parse a library and build Components (default: 1)",
+        )
+
+        parser.add_argument(
+            "-t",
+            "--task-size",
+            metavar="FUNCTIONS",
+            type=int,
+            default=None,
+            help="maximum number of functions tested by each task given to a worker (default: the larger of --jobs and --batch)",
+        )
+
+        parser.add_argument(
+            "-c",
+            "--cache",
+            metavar="DIRECTORY",
+            nargs="?",
+            const=True,
+            default=None,
+            help="reuse build results from previous runs, optionally cached in DIRECTORY (default: ${}, or ~/.cache/blind-helix)".format(
+                cache.CACHE_ENVIRONMENT_VARIABLE
+            ),
+        )
+
+        engine = parser.add_mutually_exclusive_group()
+
+        engine.add_argument(
+            "--batch",
+            metavar="SIZE",
+            type=int,
+            default=None,
+            help="build Components in batches of SIZE targets per CMake project",
+        )
+
+        engine.add_argument(
+            "--link",
+            action="store_true",
+            help="test Components by linking a stub that is compiled only once",
+        )
+
+        engine.add_argument(
+            "--server",
+            metavar="SOCKET",
+            nargs="?",
+            const=True,
+            default=None,
+            help="build Components on a running build server (see serve), optionally listening on SOCKET (default: ${}, or server.sock in the cache directory)".format(
+                server.SERVER_ENVIRONMENT_VARIABLE
+            ),
+        )
+
+        parser.add_argument(
+            "--timeout",
+            metavar="SECONDS",
+            type=int,
+            default=None,
+            help="stop Component builds that take longer than SECONDS",
+        )
+
+        parser.add_argument(
+            "--cpu-limit",
+            metavar="SECONDS",
+            type=int,
+            default=None,
+            help="limit the CPU time of every compiler and linker process to SECONDS",
+        )
+
+        parser.add_argument(
+            "--memory-limit",
+            metavar="MIB",
+            type=int,
+            default=None,
+            help="limit the address space of every compiler and linker process to MIB mebibytes",
+        )
+
+        parser.add_argument(
+            "--events",
+            metavar="FILE",
+            default=None,
+            help="record timing events for every phase of parsing and testing to FILE (see timing)",
+        )
+
+        parser.add_argument(
+            "--predict",
+            action="store_true",
+            help="skip building Components that static analysis shows will fail to link",
+        )
+
+        parser.add_argument(
+            "--no-build",
+            action="store_true",
+            help="do not build Components - rely on static analysis only (implies --predict)",
+        )
+
+        parser.add_argument(
+            "-b",
+            "--backend",
+            choices=linux.BACKENDS,
+            default=linux.BACKEND_NATIVE,
+            help="symbol table reader to use (default: {})".format(
+                linux.BACKEND_NATIVE
+            ),
         )
 
         parser.add_argument(
@@ -149,21 +860,95 @@ class Command(management_utils.CommandBase):
 
         parser = self.choices[options["parser"]]
         output = command_utils.directory(options["output"])
+
+        # Workers inherit this setting.
+        if options.get("events"):
+            events.configure(options["events"])
+
         level = logging.DEBUG if options["verbose"] else logging.INFO
-        lock = multiprocessing.Lock()
-        libraries = [
-            (parser, lib, output, level) for lib in sorted(set(options["library"]))
-        ]
+        settings = {
+            "cache": options.get("cache"),
+            "backend": options["backend"],
+            "jobs": options["jobs"],
+            "predict": options["predict"],
+            "build": not options["no_build"],
+            "batch": options.get("batch"),
+            "link": options["link"],
+            "server": options.get("server"),
+            "limits": command_utils.limits(
+                options.get("timeout"),
+                options.get("cpu_limit"),
+                options.get("memory_limit"),
+            ),
+        }
+        libraries = sorted(set(options["library"]))
+        size = options.get("task_size") or max(
+            options["jobs"], options.get("batch") or 1
+        )
+
+        budget = None
+        if options.get("memory_budget"):
+            budget = options["memory_budget"] * 1024 * 1024
 
         print(
-            "parsing {} libraries with {} workers{}".format(
+            "parsing {} libraries with up to {} workers{}{}".format(
                 utils.color(len(libraries), utils.COLOR.BOLD),
                 utils.color(options["number_workers"], utils.COLOR.BOLD),
+                (
+                    " and {} build jobs".format(
+                        utils.color(options["jobserver"], utils.COLOR.BOLD)
+                    )
+                    if options.get("jobserver")
+                    else ""
+                ),
                 " (verbose)" if options["verbose"] else "",
             )
         )
 
-        with multiprocessing.Pool(
-            options["number_workers"], initializer=initialize, initargs=(lock,)
-        ) as pool:
-            pool.starmap(process, libraries)
+        # Workers inherit the jobserver, which lives as long as this process.
+        host = None
+        if options.get("jobserver"):
+            host = jobserver.Jobserver(options["jobserver"])
+            jobserver.configure(host.path)
+
+        workers = {
+            RESOLVE: options["resolve_workers"],
+            ANALYZE: options["analyze_workers"],
+            TEST: options["number_workers"],
+            SAVE: options["save_workers"],
+        }
+        initargs = (parser, output, level, settings)
+
+        try:
+            # Unlike ``multiprocessing.Pool`` workers, executor workers are not
+            # daemonic so they may start processes of their own (see ``--jobs``).
+            with futures.ProcessPoolExecutor(
+                workers[RESOLVE], initializer=initialize, initargs=initargs
+            ) as resolvers, futures.ProcessPoolExecutor(
+                workers[ANALYZE], initializer=initialize, initargs=initargs
+            ) as analyzers, futures.ProcessPoolExecutor(
+                workers[TEST], initializer=initialize, initargs=initargs
+            ) as testers, futures.ThreadPoolExecutor(
+                workers[SAVE]
+            ) as savers:
+                executors = {
+                    RESOLVE: resolvers,
+                    ANALYZE: analyzers,
+                    TEST: testers,
+                    SAVE: savers,
+                }
+
+                schedule(
+                    {s: (executors[s], workers[s]) for s in STAGES},
+                    libraries,
+                    output,
+                    size,
+                    settings["build"],
+                    options["queue_size"],
+                    jobs=options["jobs"],
+                    budget=budget,
+                )
+        finally:
+            if host is not None:
+                jobserver.configure(None)
+                host.close()
@@ -3,9 +3,15 @@ import logging
 
 from helix.management import utils as management_utils
 
+from ... import cache
+from ... import events
+from ... import server
 from ... import utils
 from ... import parsers
 from ... import exceptions
+from ...parsers import linux
+
+from . import utils as command_utils
 
 
 def error(exception):
@@ -49,6 +55,113 @@ class Command(management_utils.CommandBase):
             help="path to the target library (optional if it can be inferred from the library name)",
         )
 
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help="number of parallel jobs used to parse the library and build Components (default: 1)",
+        )
+
+        parser.add_argument(
+            "-c",
+            "--cache",
+            metavar="DIRECTORY",
+            nargs="?",
+            const=True,
+            default=None,
+            help="reuse build results from previous runs, optionally cached in DIRECTORY (default: ${}, or ~/.cache/blind-helix)".format(
+                cache.CACHE_ENVIRONMENT_VARIABLE
+            ),
+        )
+
+        engine = parser.add_mutually_exclusive_group()
+
+        engine.add_argument(
+            "--batch",
+            metavar="SIZE",
+            type=int,
+            default=None,
+            help="build Components in batches of SIZE targets per CMake project",
+        )
+
+        engine.add_argument(
+            "--link",
+            action="store_true",
+            help="test Components by linking a stub that is compiled only once",
+        )
+
+        engine.add_argument(
+            "--server",
+            metavar="SOCKET",
+            nargs="?",
+            const=True,
+            default=None,
+            help="build Components on a running build server (see serve), optionally listening on SOCKET (default: ${}, or server.sock in the cache directory)".format(
+                server.SERVER_ENVIRONMENT_VARIABLE
+            ),
+        )
+
+        parser.add_argument(
+            "--timeout",
+            metavar="SECONDS",
+            type=int,
+            default=None,
+            help="stop Component builds that take longer than SECONDS",
+        )
+
+        parser.add_argument(
+            "--cpu-limit",
+            metavar="SECONDS",
+            type=int,
+            default=None,
+            help="limit the CPU time of every compiler and linker process to SECONDS",
+        )
+
+        parser.add_argument(
+            "--memory-limit",
+            metavar="MIB",
+            type=int,
+            default=None,
+            help="limit the address space of every compiler and linker process to MIB mebibytes",
+        )
+
+        parser.add_argument(
+            "--journal",
+            metavar="FILE",
+            default=None,
+            help="record build results in FILE and resume from the results it already contains",
+        )
+
+        parser.add_argument(
+            "--events",
+            metavar="FILE",
+            default=None,
+            help="record timing events for every phase of parsing and testing to FILE (see timing)",
+        )
+
+        parser.add_argument(
+            "--predict",
+            action="store_true",
+            help="skip building Components that static analysis shows will fail to link",
+        )
+
+        parser.add_argument(
+            "--no-build",
+            action="store_true",
+            help="do not build Components - rely on static analysis only (implies --predict)",
+        )
+
+        parser.add_argument(
+            "-b",
+            "--backend",
+            choices=linux.BACKENDS,
+            default=linux.BACKEND_NATIVE,
+            help="symbol table reader to use (default: {})".format(
+                linux.BACKEND_NATIVE
+            ),
+        )
+
         parser.add_argument(
             "-v",
             "--verbose",
@@ -69,17 +182,47 @@ class Command(management_utils.CommandBase):
 
         Parser = self.choices[options["parser"]]
 
+        if options.get("events"):
+            events.configure(options["events"])
+
         print("parsing {}".format(utils.color(options["name"], utils.COLOR.BOLD)))
 
+        engine = command_utils.engine(
+            options.get("batch"),
+            options["link"],
+            options.get("server"),
+            command_utils.limits(
+                options.get("timeout"),
+                options.get("cpu_limit"),
+                options.get("memory_limit"),
+            ),
+        )
+
         try:
-            parser = Parser(options["name"], options.get("path", None))
+            parser = Parser(
+                options["name"],
+                options.get("path", None),
+                backend=options["backend"],
+                jobs=options["jobs"],
+            )
             Library = parser.build()
-            TestedLibrary = parser.test(Library)
+            TestedLibrary = parser.test(
+                Library,
+                jobs=options["jobs"],
+                cache=command_utils.cache(options.get("cache")),
+                predict=options["predict"],
+                build=not options["no_build"],
+                engine=engine,
+                journal=command_utils.journal(options.get("journal")),
+            )
         except exceptions.BlindHELIXException as e:
             error(e)
+        finally:
+            engine.close()
 
-        with open(options["output"], "w") as f:
-            TestedLibrary.save(f)
+        with events.span(events.SAVE, options["name"]):
+            with open(options["output"], "wb") as f:
+                TestedLibrary.save(f)
 
         print(
             "saved {} Components to {}".format(
@@ -0,0 +1,72 @@
+import sys
+import signal
+import logging
+
+from helix.management import utils as management_utils
+
+from ... import utils
+from ... import server
+from ... import exceptions
+
+from . import utils as command_utils
+
+
+def terminate(signum, frame):
+    raise SystemExit(0)
+
+
+class Command(management_utils.CommandBase):
+    """Run a build server that Components can be tested on."""
+
+    name = "serve"
+    help = "run a local build server for testing Components (see --server)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-s",
+            "--socket",
+            default=None,
+            help="path of the Unix socket to listen on (default: ${}, or server.sock in the cache directory)".format(
+                server.SERVER_ENVIRONMENT_VARIABLE
+            ),
+        )
+
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help="number of Components to build at once (default: 1)",
+        )
+
+        parser.add_argument(
+            "-v", "--verbose", action="store_true", help="log every build"
+        )
+
+    def handle(self, *args, **options):
+        logging.basicConfig(
+            format="%(message)s",
+            stream=sys.stdout,
+            level=logging.DEBUG if options["verbose"] else logging.INFO,
+        )
+
+        try:
+            instance = server.Server(options.get("socket"), jobs=options["jobs"])
+        except exceptions.BlindHELIXException as e:
+            command_utils.error(e)
+
+        print(
+            "serving on {} with {} jobs".format(
+                utils.color(instance.server_address, utils.COLOR.BOLD),
+                utils.color(options["jobs"], utils.COLOR.BOLD),
+            )
+        )
+
+        signal.signal(signal.SIGTERM, terminate)
+
+        try:
+            instance.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            instance.server_close()
@@ -0,0 +1,111 @@
+import os
+
+from helix.management import utils as management_utils
+
+from ... import utils
+from ... import events
+
+from . import utils as command_utils
+
+
+def duration(seconds):
+    """Format a duration for display."""
+
+    if seconds < 60:
+        return "{:.2f}s".format(seconds)
+
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    if hours:
+        return "{}h{:02}m{:02}s".format(hours, minutes, seconds)
+
+    return "{}m{:02}s".format(minutes, seconds)
+
+
+class Command(management_utils.CommandBase):
+    """Summarize the timing events recorded by parse or parse-many."""
+
+    name = "timing"
+    help = "summarize timing events recorded with --events"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "events", nargs="+", help="one or more events files (see --events)"
+        )
+
+        parser.add_argument(
+            "-t",
+            "--top",
+            metavar="FUNCTIONS",
+            type=int,
+            default=10,
+            help="number of slowest functions to list (default: 10)",
+        )
+
+    def handle(self, *args, **options):
+        recorded = []
+
+        for path in options["events"]:
+            try:
+                recorded += events.load(os.path.abspath(os.path.expanduser(path)))
+            except OSError as e:
+                command_utils.error(e)
+
+        summary = events.summarize(recorded, top=options["top"])
+
+        if summary is None:
+            command_utils.error("no events found")
+
+        print(
+            "{} functions from {} libraries in {} ({} functions/hour)".format(
+                utils.color(summary["functions"], utils.COLOR.BOLD),
+                utils.color(summary["libraries"], utils.COLOR.BOLD),
+                utils.color(duration(summary["elapsed"]), utils.COLOR.BOLD),
+                utils.color("{:.1f}".format(summary["rate"]), utils.COLOR.BOLD),
+            )
+        )
+
+        print()
+
+        row = "{:<16} {:>8} {:>8} {:>12} {:>10} {:>10}"
+
+        print(
+            utils.color(
+                row.format("phase", "count", "failed", "total", "p50", "p95"),
+                utils.COLOR.BOLD,
+            )
+        )
+
+        for phase, statistics in summary["phases"].items():
+            print(
+                row.format(
+                    phase,
+                    statistics["count"],
+                    statistics["failed"],
+                    duration(statistics["total"]),
+                    duration(statistics["p50"]),
+                    duration(statistics["p95"]),
+                )
+            )
+
+        if not summary["slowest"]:
+            return
+
+        print()
+        print(utils.color("slowest functions", utils.COLOR.BOLD))
+
+        for library, function, total, phases in summary["slowest"]:
+            print(
+                "{} {}:{} ({})".format(
+                    duration(total).rjust(10),
+                    utils.color(library, utils.COLOR.BOLD),
+                    function,
+                    ", ".join(
+                        "{} {}".format(phase, duration(phases[phase]))
+                        for phase in sorted(
+                            phases, key=lambda p: phases[p], reverse=True
+                        )
+                    ),
+                )
+            )
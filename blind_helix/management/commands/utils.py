@@ -1,5 +1,8 @@
 import os
 
+from ... import cache as build_cache
+from ... import engines
+from ... import journal as build_journal
 from ... import library
 from ... import utils
 
@@ -9,7 +12,7 @@ def load(exports):
     components = {}
 
     for export in exports:
-        with open(os.path.abspath(os.path.expanduser(export)), "r") as f:
+        with open(os.path.abspath(os.path.expanduser(export)), "rb") as f:
             lib = library.Library.load(f)()
             for component in lib.components:
                 if component.library not in components:
@@ -31,6 +34,42 @@ def error(exception):
     exit(1)
 
 
+def cache(path):
+    if path is None:
+        return None
+
+    return build_cache.BuildCache(None if path is True else path)
+
+
+def journal(path):
+    if path is None:
+        return None
+
+    return build_journal.Journal(os.path.abspath(os.path.expanduser(path)))
+
+
+def limits(timeout=None, cpu=None, memory=None):
+    if not (timeout or cpu or memory):
+        return None
+
+    return utils.Limits(
+        timeout=timeout, cpu=cpu, memory=memory * 1024 * 1024 if memory else None
+    )
+
+
+def engine(batch=None, link=False, server=None, limits=None):
+    if server is not None:
+        return engines.ServerEngine(None if server is True else server, limits=limits)
+
+    if link:
+        return engines.LinkEngine(limits=limits)
+
+    if batch is not None:
+        return engines.BatchEngine(batch, limits=limits)
+
+    return engines.SingleEngine(limits=limits)
+
+
 def touch(path):
     with open(path, "w") as f:
         f.write("")
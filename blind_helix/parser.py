@@ -1,11 +1,140 @@
+import os
 import abc
+import json
 import shutil
 import tempfile
 
+from . import errors
+from . import events
 from . import exceptions
 from . import library
 
 
+class Symbols:
+    """The symbol table of a single object file in a library.
+
+    Args:
+        name (str): The name of the object file.
+        exported (list): Exported (C) symbols defined in the object.
+        functions (list): All (C) functions defined in the object, exported or
+            not.
+        defined (list): All global symbols defined in the object (including
+            C++ symbols).
+        undefined (list): All symbols referenced but not defined by the object,
+            excluding weak references.
+    """
+
+    def __init__(
+        self, name, exported=None, functions=None, defined=None, undefined=None
+    ):
+        self.name = name
+        self.exported = exported or []
+        self.functions = functions or []
+        self.defined = defined or []
+        self.undefined = undefined or []
+
+    def rename(self, mapping):
+        """Apply a symbol renaming to this table.
+
+        Args:
+            mapping (dict): A mapping of old to new symbol names.
+
+        Returns:
+            A new symbol table with the renaming applied.
+        """
+
+        def rename(symbols):
+            return [mapping.get(s, s) for s in symbols]
+
+        return Symbols(
+            self.name,
+            exported=rename(self.exported),
+            functions=rename(self.functions),
+            defined=rename(self.defined),
+            undefined=rename(self.undefined),
+        )
+
+
+class Analysis:
+    """The result of analyzing a library file.
+
+    This bundles the finalized library file with the symbol table of each
+    object in it so that it can be computed once and shared by everything that
+    needs it.
+
+    Args:
+        library (file): The finalized library file (typically a temporary
+            file).
+        objects (list): A ``Symbols`` table for each object in the library, in
+            order.
+    """
+
+    LIBRARY = "library"
+    """The name of the finalized library file written by ``save()``."""
+
+    SYMBOLS = "symbols.json"
+    """The name of the symbol table file written by ``save()``."""
+
+    def __init__(self, library, objects):
+        self.library = library
+        self.objects = objects
+
+    def save(self, directory):
+        """Save this analysis to a directory.
+
+        This allows an analysis to be shared with other processes rather than
+        repeated by each of them.
+
+        Args:
+            directory (str): The directory to write to. It is created if it
+                does not exist.
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        shutil.copyfile(self.library.name, os.path.join(directory, self.LIBRARY))
+
+        with open(os.path.join(directory, self.SYMBOLS), "w") as f:
+            json.dump([vars(o) for o in self.objects], f)
+
+    @classmethod
+    def load(cls, directory):
+        """Load an analysis written with ``save()``.
+
+        Args:
+            directory (str): The directory the analysis was saved to.
+
+        Returns:
+            An ``Analysis`` whose library is the file in ``directory``.
+        """
+
+        with open(os.path.join(directory, cls.SYMBOLS), "r") as f:
+            objects = [Symbols(**o) for o in json.load(f)]
+
+        return cls(open(os.path.join(directory, cls.LIBRARY), "rb"), objects)
+
+    def functions(self, exported=True):
+        """List the functions in the finalized library.
+
+        Args:
+            exported (bool): If ``True`` include only exported functions.
+
+        Returns:
+            A list of function names, in library order.
+        """
+
+        functions = []
+
+        for o in self.objects:
+            if exported:
+                symbols = set(o.exported)
+                functions += [f for f in o.functions if f in symbols]
+            else:
+                functions += o.functions
+
+        return functions
+
+
 class LibraryParser(metaclass=abc.ABCMeta):
     """A base class for parsing a list of functions from a library.
 
@@ -13,6 +142,9 @@ class LibraryParser(metaclass=abc.ABCMeta):
         name (str): The library name.
         path (str): The full path to the library file (optional if it can be
             inferred from the library name)
+        analysis (Analysis): An optional analysis of the library computed
+            previously (see ``analyze()``) - if this is provided the library
+            is not finalized or parsed again.
     """
 
     @property
@@ -22,9 +154,10 @@ class LibraryParser(metaclass=abc.ABCMeta):
 
         return ""
 
-    def __init__(self, name, path=None):
+    def __init__(self, name, path=None, analysis=None):
         self.name = name
         self._path = path
+        self._analysis = analysis
 
     def path(self, name):
         """Find the absolute path to a given library.
@@ -82,6 +215,49 @@ class LibraryParser(metaclass=abc.ABCMeta):
 
         return f
 
+    def analyze(self):
+        """Finalize and parse the target library.
+
+        The result is computed once and reused by both ``build()`` and
+        ``test()``. You can override this method if your parser can collect
+        symbol tables more efficiently than by calling ``finalize()`` and
+        ``parse()`` (which is what this default implementation does).
+
+        Returns:
+            An ``Analysis`` of the finalized library.
+        """
+
+        if self._analysis is None:
+            path = self.path(self.name)
+
+            with events.span(events.FINALIZE, self.name):
+                finalized = self.finalize(path)
+
+            with events.span(events.PARSE, self.name):
+                symbols = Symbols(
+                    finalized.name,
+                    exported=self.parse(finalized.name),
+                    functions=self.parse(finalized.name, exported=False),
+                )
+
+            self._analysis = Analysis(finalized, [symbols])
+
+        return self._analysis
+
+    def index(self):
+        """Build a static reachability index of the target library.
+
+        Override this method if your parser can collect per-object symbol
+        tables (``Symbols.defined`` and ``Symbols.undefined``) along with the
+        symbols available from the libraries linked by default.
+
+        Returns:
+            A ``reachability.Index`` of the finalized library or ``None`` if
+            static analysis is not supported by this parser.
+        """
+
+        return None
+
     def build(self, version=None, date=None):
         """Generates a Library using this Parser.
 
@@ -89,37 +265,113 @@ class LibraryParser(metaclass=abc.ABCMeta):
             A generated Library, ready for testing/export/component generation.
         """
 
-        finalized = self.finalize(self.path(self.name))
-
-        functions = self.parse(finalized.name)
+        analysis = self.analyze()
 
-        return library.build(self.name, finalized.name, functions, version, date)
+        return library.build(
+            self.name,
+            analysis.library.name,
+            analysis.functions(),
+            version=version,
+            date=date,
+        )
 
-    def test(self, library):
+    def test(
+        self,
+        library,
+        jobs=1,
+        cache=None,
+        predict=False,
+        build=True,
+        engine=None,
+        journal=None,
+    ):
         """Tests a given Library class.
 
         Args:
             library (class): A library class.
+            jobs (int): The number of Components to build in parallel -
+                default: 1.
+            cache (BuildCache): An optional build result cache.
+            predict (bool): If ``True``, skip building Components that static
+                analysis shows will fail with undefined references.
+            build (bool): If ``False``, do not build any Components - rely
+                entirely on static analysis, including for the included
+                functions.
+            engine (Engine): The engine used to build Components - default:
+                a ``SingleEngine``.
+            journal (Journal): An optional journal of build results, used to
+                resume an interrupted run.
 
         Returns:
             A modified version of ``library`` that only includes functioning
             Components.
+
+        Note:
+            Included functions are attributed from the archive members named
+            in the linker map of each test build where possible (see
+            ``LibrarySliceComponent.members()``), so every function defined in
+            a linked member is included - even if the linker then discards it
+            (e.g., with LTO or ``--gc-sections``), unlike parsing the built
+            binary. The built binary is parsed instead if there is no linker
+            map, or if members linked into the build share a name with other
+            objects in the library, since the map does not say which of them
+            was linked.
         """
 
-        finalized = self.finalize(self.path(self.name))
-        base = set(self.parse(finalized.name, exported=False))
+        analysis = self.analyze()
+        base = set(analysis.functions(exported=False))
 
-        included = {}
+        library = library()
 
-        def parse(name, artifacts):
-            included[name] = []
+        index = None
+        if predict or not build:
+            index = self.index()
 
-            for a in artifacts:
-                functions = set(self.parse(a, exported=False))
-                included[name] += list(functions & base)
+            if index is None:
+                raise exceptions.BlindHELIXException(
+                    "{} does not support static analysis".format(self.display)
+                )
 
-        library = library()
-        TestedLibrary = library.test(callback=parse)
-        TestedLibrary.included = included
+        if not build:
+            functions = [f for f in library.functions if index.unresolved(f) == []]
+
+            return library.subset(functions, {f: index.included(f) for f in functions})
+
+        def unresolved(name):
+            if index.unresolved(name):
+                return errors.UndefinedReference
+
+            return None
+
+        def parse(name, artifacts):
+            with events.span(events.INCLUDED, self.name, name):
+                # Attribute functions by the object files the linker pulled in
+                # where possible - this avoids parsing every artifact.
+                members = library.by_function(name).members(artifacts) or set()
+                objects = [o for o in analysis.objects if o.name in members]
+
+                # The map only names members, so objects with the same name
+                # cannot be told apart.
+                names = [o.name for o in objects]
+                ambiguous = len(set(names)) != len(names)
+
+                if objects and not ambiguous:
+                    functions = set(f for o in objects for f in o.functions)
+                else:
+                    functions = set()
+
+                    for a in artifacts:
+                        functions |= set(self.parse(a, exported=False))
+
+            return sorted(functions & base)
+
+        TestedLibrary = library.test(
+            callback=parse,
+            jobs=jobs,
+            cache=cache,
+            predict=unresolved if index is not None else None,
+            engine=engine,
+            journal=journal,
+        )
 
         return TestedLibrary
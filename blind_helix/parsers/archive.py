@@ -0,0 +1,311 @@
+import os
+import mmap
+import struct
+
+from .. import exceptions
+
+MAGIC = b"!<arch>\n"
+THIN_MAGIC = b"!<thin>\n"
+
+HEADER_SIZE = 60
+HEADER_MAGIC = b"`\n"
+
+GNU_NAMES = "//"
+GNU_SYMBOLS = ("/", "/SYM64/")
+BSD_NAME_PREFIX = "#1/"
+BSD_SYMBOLS = ("__.SYMDEF", "__.SYMDEF SORTED")
+
+
+class InvalidArchive(exceptions.BlindHELIXException):
+    """Raised when an archive is malformed or unsupported."""
+
+
+def is_archive(path):
+    """Check if the given file is an ``ar`` archive (regular or thin).
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        ``True`` if the file is an ``ar`` archive, ``False`` otherwise.
+    """
+
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+
+    return magic in (MAGIC, THIN_MAGIC)
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Member:
+    """A single member of an archive.
+
+    Args:
+        name (str): The member name.
+        data (memoryview): The member content.
+        index (int): The position of this member in the archive - members
+            may share names, but never an index.
+    """
+
+    def __init__(self, name, data, index):
+        self.name = name
+        self.data = data
+        self.index = index
+
+    def __repr__(self):
+        return "{}({}, {} bytes)".format(
+            self.__class__.__name__, self.name, len(self.data)
+        )
+
+
+class Archive:
+    """A memory mapped, read-only ``ar`` archive.
+
+    This supports GNU/System V archives (including the ``//`` long name
+    table), BSD archives (``#1/`` names) and GNU thin archives. Symbol tables
+    are skipped when iterating over members (see ``symbols()``). Member
+    content is never copied or written to disk - each member's content is a
+    view of the memory mapped archive, so it cannot be used once the archive
+    is closed.
+
+    Unlike ``ar x``, members with duplicate names are all preserved.
+
+    Args:
+        path (str): The path to the archive file.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+
+        self._data = _map(self.path)
+        self._view = memoryview(self._data)
+        self._views = []
+        self._mappings = []
+
+        magic = bytes(self._view[: len(MAGIC)])
+
+        if magic == MAGIC:
+            self.thin = False
+        elif magic == THIN_MAGIC:
+            self.thin = True
+        else:
+            self.close()
+            raise InvalidArchive("invalid archive file: {}".format(self.path))
+
+    def _name(self, raw, names):
+        """Resolve a raw member name.
+
+        Returns:
+            A tuple of the resolved name and the number of bytes of the
+            member's data occupied by the name (BSD only).
+        """
+
+        raw = raw.decode("utf-8", errors="replace").rstrip(" ")
+
+        if raw in GNU_SYMBOLS or raw == GNU_NAMES:
+            return raw, 0
+
+        if raw.startswith(BSD_NAME_PREFIX):
+            return None, int(raw[len(BSD_NAME_PREFIX) :])
+
+        if raw.startswith("/") and raw[1:].isdigit():
+            if names is None:
+                raise InvalidArchive(
+                    "long name reference without a name table: {}".format(self.path)
+                )
+
+            offset = int(raw[1:])
+            end = names.find(b"\n", offset)
+            name = names[offset : end if end >= 0 else len(names)]
+
+            return name.decode("utf-8", errors="replace").rstrip("/"), 0
+
+        return raw.rstrip("/"), 0
+
+    def __iter__(self):
+        """Iterate over the members of this archive, in order."""
+
+        view = self._view
+        position = len(MAGIC)
+        names = None
+        index = 0
+
+        while position + HEADER_SIZE <= len(view):
+            header = bytes(view[position : position + HEADER_SIZE])
+
+            if header[58:60] != HEADER_MAGIC:
+                raise InvalidArchive(
+                    "corrupt member header at offset {}: {}".format(position, self.path)
+                )
+
+            try:
+                size = int(header[48:58].decode("ascii").strip() or 0)
+            except ValueError:
+                raise InvalidArchive(
+                    "invalid member size at offset {}: {}".format(position, self.path)
+                )
+
+            start = position + HEADER_SIZE
+            name, length = self._name(header[:16], names)
+
+            special = name == GNU_NAMES or name in GNU_SYMBOLS
+
+            # Thin archives only store the name and symbol tables - member
+            # content lives in external files.
+            stored = not self.thin or special
+            end = start + size if stored else start
+
+            if end > len(view):
+                raise InvalidArchive("truncated archive: {}".format(self.path))
+
+            if name == GNU_NAMES:
+                names = bytes(view[start:end])
+            elif name is None:
+                name = bytes(view[start : start + length])
+                name = name.decode("utf-8", errors="replace").rstrip("\0")
+
+                if name not in BSD_SYMBOLS:
+                    yield self._member(name, view[start + length : end], index)
+                    index += 1
+            elif not special:
+                if self.thin:
+                    data = self._external(name)
+                else:
+                    data = view[start:end]
+
+                yield self._member(name, data, index)
+                index += 1
+
+            position = end + end % 2
+
+    def _member(self, name, data, index):
+        """Create a member, keeping its view so that it is released on
+        ``close()``."""
+
+        self._views.append(data)
+
+        return Member(name, data, index)
+
+    def symbols(self):
+        """Read the archive symbol table.
+
+        The symbol table (written by ``ar s`` or ``ranlib``) lists the global
+        symbols defined by the archive members, so this is much cheaper than
+        parsing every member.
+
+        Returns:
+            A list of symbol names or ``None`` if the archive has no symbol
+            table.
+        """
+
+        view = self._view
+        position = len(MAGIC)
+
+        if position + HEADER_SIZE > len(view):
+            return None
+
+        header = bytes(view[position : position + HEADER_SIZE])
+
+        if header[58:60] != HEADER_MAGIC:
+            raise InvalidArchive(
+                "corrupt member header at offset {}: {}".format(position, self.path)
+            )
+
+        size = int(header[48:58].decode("ascii").strip() or 0)
+        name, length = self._name(header[:16], None)
+
+        start = position + HEADER_SIZE
+        data = bytes(view[start : start + size])
+
+        try:
+            if name in GNU_SYMBOLS:
+                width = 8 if name == "/SYM64/" else 4
+                fmt = ">Q" if width == 8 else ">I"
+
+                (count,) = struct.unpack_from(fmt, data)
+                strings = data[width * (count + 1) :]
+
+                return [
+                    s.decode("utf-8", errors="replace")
+                    for s in strings.split(b"\0")[:count]
+                ]
+
+            if name is None:
+                member = data[:length].decode("utf-8", errors="replace")
+
+                if member.rstrip("\0") not in BSD_SYMBOLS:
+                    return None
+
+                data = data[length:]
+
+                (ranlibs,) = struct.unpack_from("<I", data)
+                (table,) = struct.unpack_from("<I", data, 4 + ranlibs)
+                strings = data[8 + ranlibs : 8 + ranlibs + table]
+
+                symbols = []
+
+                for i in range(ranlibs // 8):
+                    (offset,) = struct.unpack_from("<I", data, 4 + i * 8)
+                    end = strings.find(b"\0", offset)
+
+                    symbols.append(
+                        strings[offset : end if end >= 0 else len(strings)].decode(
+                            "utf-8", errors="replace"
+                        )
+                    )
+
+                return symbols
+        except struct.error:
+            raise InvalidArchive("corrupt symbol table: {}".format(self.path))
+
+        return None
+
+    def _external(self, name):
+        """Map the content of a thin archive member."""
+
+        path = os.path.join(os.path.dirname(self.path), name)
+
+        try:
+            data = _map(path)
+        except OSError as e:
+            raise InvalidArchive("missing thin archive member {}: {}".format(path, e))
+
+        self._mappings.append(data)
+
+        return memoryview(data)
+
+    def close(self):
+        """Unmap this archive.
+
+        The content of every member is released first.
+
+        Raises:
+            BufferError: If the content of a member is still in use (e.g., by
+                a ``memoryview`` created from it).
+        """
+
+        for view in self._views + [self._view]:
+            view.release()
+
+        for data in [self._data] + self._mappings:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+        self._views = []
+        self._mappings = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+__all__ = ["Archive", "Member", "InvalidArchive", "is_archive"]
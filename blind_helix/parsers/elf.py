@@ -0,0 +1,246 @@
+import os
+import mmap
+import struct
+
+from .. import exceptions
+
+MAGIC = b"\x7fELF"
+
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+SHT_SYMTAB = 2
+SHT_DYNSYM = 11
+
+SHN_UNDEF = 0
+
+STB_LOCAL = 0
+STB_GLOBAL = 1
+STB_WEAK = 2
+STB_GNU_UNIQUE = 10
+
+STT_NOTYPE = 0
+STT_OBJECT = 1
+STT_FUNC = 2
+STT_SECTION = 3
+STT_FILE = 4
+STT_COMMON = 5
+STT_TLS = 6
+STT_GNU_IFUNC = 10
+
+STV_DEFAULT = 0
+STV_INTERNAL = 1
+STV_HIDDEN = 2
+STV_PROTECTED = 3
+
+# (header, section header, symbol) layouts, excluding ``e_ident``.
+LAYOUTS = {
+    ELFCLASS32: ("HHIIIIIHHHHHH", "IIIIIIIIII", "IIIBBH"),
+    ELFCLASS64: ("HHIQQQIHHHHHH", "IIQQQQIIQQ", "IBBHQQ"),
+}
+
+
+class InvalidELF(exceptions.BlindHELIXException):
+    """Raised when an ELF file is malformed or unsupported."""
+
+
+class Symbol:
+    """A single ELF symbol table entry.
+
+    The ``is_function``, ``exported`` and ``imported`` properties follow the
+    same definitions as the equivalent LIEF properties so the two can be used
+    interchangeably.
+
+    Args:
+        name (str): The symbol name.
+        binding (int): The symbol binding (``STB_*``).
+        type (int): The symbol type (``STT_*``).
+        visibility (int): The symbol visibility (``STV_*``).
+        shndx (int): The index of the section in which the symbol is defined.
+        value (int): The symbol value.
+        size (int): The symbol size.
+    """
+
+    __slots__ = ("name", "binding", "type", "visibility", "shndx", "value", "size")
+
+    def __init__(self, name, binding, type, visibility, shndx, value, size):
+        self.name = name
+        self.binding = binding
+        self.type = type
+        self.visibility = visibility
+        self.shndx = shndx
+        self.value = value
+        self.size = size
+
+    @property
+    def is_function(self):
+        return self.type == STT_FUNC
+
+    @property
+    def defined(self):
+        """If this symbol is defined (rather than referenced) by the binary."""
+
+        return self.shndx != SHN_UNDEF
+
+    @property
+    def imported(self):
+        return (
+            not self.defined
+            and bool(self.name)
+            and self.binding in (STB_GLOBAL, STB_WEAK)
+            and self.type in (STT_FUNC, STT_GNU_IFUNC, STT_OBJECT)
+        )
+
+    @property
+    def exported(self):
+        return (
+            self.defined
+            and self.binding in (STB_GLOBAL, STB_WEAK, STB_GNU_UNIQUE)
+            and self.type in (STT_FUNC, STT_GNU_IFUNC, STT_OBJECT)
+            and (self.value != 0 or self.size > 0)
+        )
+
+    def __repr__(self):
+        return "{}({})".format(self.__class__.__name__, self.name)
+
+
+class Binary:
+    """The symbol tables of an ELF binary.
+
+    Only the section headers and the ``.symtab`` and ``.dynsym`` symbol tables
+    (with their string tables) are read - nothing else is parsed. Both ELF32
+    and ELF64 in either byte order are supported.
+
+    Args:
+        data (bytes): The content of the ELF file - any object supporting the
+            buffer protocol (e.g., a ``memoryview`` or an ``mmap``).
+    """
+
+    def __init__(self, data):
+        # Released on every exit, including errors, so that an ``mmap`` can be
+        # closed even while a traceback refers to this frame.
+        with memoryview(data) as data:
+            self._parse(data)
+
+    def _parse(self, data):
+        if len(data) < 16 or bytes(data[:4]) != MAGIC:
+            raise InvalidELF("not an ELF file")
+
+        elfclass, encoding = data[4], data[5]
+
+        if elfclass not in LAYOUTS or encoding not in (ELFDATA2LSB, ELFDATA2MSB):
+            raise InvalidELF("unsupported ELF class or data encoding")
+
+        order = "<" if encoding == ELFDATA2LSB else ">"
+        header, section, symbol = (
+            struct.Struct(order + layout) for layout in LAYOUTS[elfclass]
+        )
+
+        self.elfclass = elfclass
+
+        try:
+            fields = header.unpack_from(data, 16)
+        except struct.error:
+            raise InvalidELF("truncated ELF header")
+
+        shoff, shentsize, shnum = fields[5], fields[10], fields[11]
+
+        sections = []
+
+        if shoff:
+            try:
+                if shnum == 0:
+                    # The real count is stored in the first section header.
+                    shnum = section.unpack_from(data, shoff)[5]
+
+                for i in range(shnum):
+                    sections.append(section.unpack_from(data, shoff + i * shentsize))
+            except struct.error:
+                raise InvalidELF("truncated section header table")
+
+        self.symbols = []
+
+        for s in sections:
+            if s[1] in (SHT_SYMTAB, SHT_DYNSYM):
+                self.symbols += self._table(data, sections, s, symbol)
+
+    def _table(self, data, sections, table, layout):
+        _, _, _, _, offset, size, link, _, _, entsize = table
+
+        if link >= len(sections):
+            raise InvalidELF("invalid symbol string table index")
+
+        strings = sections[link]
+
+        if offset + size > len(data) or strings[4] + strings[5] > len(data):
+            raise InvalidELF("truncated symbol table")
+
+        strings = bytes(data[strings[4] : strings[4] + strings[5]])
+
+        entsize = entsize or layout.size
+        symbols = []
+
+        for position in range(offset, offset + size - entsize + 1, entsize):
+            fields = layout.unpack_from(data, position)
+
+            if self.elfclass == ELFCLASS64:
+                name, info, other, shndx, value, size = fields
+            else:
+                name, value, size, info, other, shndx = fields
+
+            end = strings.find(b"\0", name)
+
+            symbols.append(
+                Symbol(
+                    strings[name : end if end >= 0 else len(strings)].decode(
+                        "utf-8", errors="replace"
+                    ),
+                    info >> 4,
+                    info & 0xF,
+                    other & 0x3,
+                    shndx,
+                    value,
+                    size,
+                )
+            )
+
+        return symbols
+
+
+def parse(data):
+    """Parse the symbol tables of an ELF binary.
+
+    Args:
+        data (bytes): The content of the ELF file.
+
+    Returns:
+        A ``Binary``.
+    """
+
+    return Binary(data)
+
+
+def parse_file(path):
+    """Parse the symbol tables of an ELF file.
+
+    The file is memory mapped rather than read.
+
+    Args:
+        path (str): The path to the ELF file.
+
+    Returns:
+        A ``Binary``.
+    """
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise InvalidELF("empty file: {}".format(path))
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return Binary(data)
+
+
+__all__ = ["Binary", "Symbol", "InvalidELF", "parse", "parse_file"]
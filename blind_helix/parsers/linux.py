@@ -1,121 +1,388 @@
+import io
 import os
+import shlex
+import logging
 import tempfile
+import multiprocessing
+
+from concurrent import futures
 
-import magic
 import lief
 
 from helix import utils as helix_utils
 
 from .. import parser
+from .. import events
 from .. import exceptions
+from .. import reachability
 
+from . import elf
+from . import archive
 from . import utils
 
-
 lief.logging.disable()
 
+logger = logging.getLogger()
 
-class GenericLinuxLibrary(parser.LibraryParser):
-    """A library parser for system-installed Linux libraries."""
 
-    display = "generic-linux-library"
+BACKEND_NATIVE = "native"
+BACKEND_LIEF = "lief"
 
-    def _parse_archive(self, archive, callback):
-        working = tempfile.TemporaryDirectory()
+BACKENDS = (BACKEND_NATIVE, BACKEND_LIEF)
 
-        ar = helix_utils.find("ar")
-        helix_utils.run(
-            "{} x {}".format(ar, archive),
-            working.name,
+
+def _load(data, backend):
+    """Read the symbol tables of an object file.
+
+    Args:
+        data (memoryview): The object file content.
+        backend (str): The symbol table reader to use.
+
+    Returns:
+        A binary with a ``symbols`` list, or ``None`` if the object could not
+        be parsed.
+    """
+
+    if backend == BACKEND_NATIVE:
+        try:
+            return elf.parse(data)
+        except elf.InvalidELF:
+            pass
+
+    # A file object rather than a list of ints, which is far larger and slower
+    # to build - LIEF 0.11 does not accept ``bytes`` directly.
+    return lief.parse(io.BytesIO(data))
+
+
+def _symbols(binary, name):
+    """Collect the symbol table of a single object file."""
+
+    symbols = parser.Symbols(name)
+
+    for s in binary.symbols:
+        if not s.name:
+            continue
+
+        # Skipping C++ symbols.
+        # Experimentally, C++ functions are somewhat problematic because they
+        # often contain a lot of template code that is essentially the same
+        # across all instances. More experimenting with C++ functions is
+        # necessary before attempting to include them.
+        c = lief.demangle(s.name) is None
+
+        binding = int(s.binding)
+
+        if s.shndx == elf.SHN_UNDEF:
+            # Weak references may be left unresolved and never cause archive
+            # members to be linked.
+            if binding != elf.STB_WEAK:
+                symbols.undefined.append(s.name)
+
+            continue
+
+        if binding != elf.STB_LOCAL:
+            symbols.defined.append(s.name)
+
+        if s.exported and c:
+            symbols.exported.append(s.name)
+
+        if s.is_function and c:
+            symbols.functions.append(s.name)
+
+    return symbols
+
+
+def _objects(path):
+    """List the indexes of the object files in an archive."""
+
+    with archive.Archive(path) as a:
+        return [m.index for m in a if os.path.splitext(m.name)[1] == ".o"]
+
+
+def _scan(path, backend, start=0, stop=None):
+    """Collect the symbol tables of object files in an archive.
+
+    This is the unit of work distributed to worker processes so it must be a
+    module level function.
+
+    Args:
+        path (str): The path to the archive.
+        backend (str): The symbol table reader to use.
+        start (int): The index of the first member to include.
+        stop (int): The index of the member to stop at (exclusive) - default:
+            the end of the archive.
+
+    Returns:
+        A list of ``Symbols`` for each object file in the range, in order.
+    """
+
+    tables = []
+
+    with archive.Archive(path) as a:
+        for member in a:
+            if member.index < start:
+                continue
+
+            if stop is not None and member.index >= stop:
+                break
+
+            if os.path.splitext(member.name)[1] != ".o":
+                continue
+
+            binary = _load(member.data, backend)
+
+            if binary is None:
+                continue
+
+            tables.append(_symbols(binary, member.name))
+
+    return tables
+
+
+def _trace_runtime(backend):
+    """Collect the symbols defined by the libraries linked by default.
+
+    A trivial C++ program is linked with ``--trace`` to list every file the
+    toolchain links by default (C runtime objects, the C and C++ standard
+    libraries, ``libgcc``, the dynamic loader, etc.) and the global symbols
+    defined by each file are collected.
+
+    Args:
+        backend (str): The symbol table reader to use.
+
+    Returns:
+        A set of symbol names.
+    """
+
+    compiler = os.environ.get("CXX") or helix_utils.find("c++")
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "main.cpp")
+
+        with open(source, "w") as f:
+            f.write("int main() { return 0; }\n")
+
+        stdout, _ = helix_utils.run(
+            "{} -Wl,--trace -o {} {}".format(
+                compiler,
+                shlex.quote(os.path.join(directory, "main")),
+                shlex.quote(source),
+            ),
             exception=exceptions.BlindHELIXException(
-                "invalid library file: {}".format(archive)
+                "failed to trace the default libraries linked by {}".format(compiler)
             ),
         )
 
-        for unit in os.listdir(working.name):
-            if os.path.splitext(unit)[1] != ".o":
+    paths = []
+
+    for line in stdout.decode("utf-8", errors="replace").splitlines():
+        line = line.strip()
+
+        # Archive members and libraries found by search may be reported as
+        # ``archive(member)`` and ``-lname (path)`` respectively.
+        if line.startswith("-l") and line.endswith(")"):
+            line = line[line.index("(") + 1 : -1]
+        elif line.endswith(")") and "(" in line:
+            line = line[: line.index("(")]
+
+        line = os.path.realpath(line)
+
+        if os.path.isfile(line) and line not in paths:
+            paths.append(line)
+
+    symbols = set()
+
+    for path in paths:
+        if archive.is_archive(path):
+            tables = _scan(path, backend)
+        else:
+            with open(path, "rb") as f:
+                binary = _load(f.read(), backend)
+
+            # Linker scripts (e.g., ``libc.so``) are not binaries.
+            if binary is None:
                 continue
 
-            binary = lief.parse(os.path.join(working.name, unit))
+            tables = [_symbols(binary, path)]
 
-            callback(binary)
+        for table in tables:
+            symbols.update(table.defined)
 
-        working.cleanup()
+    return symbols
 
-    def _parse_executable(self, path, callback):
-        binary = lief.parse(path)
 
-        callback(binary)
+class GenericLinuxLibrary(parser.LibraryParser):
+    """A library parser for system-installed Linux libraries.
 
-    def parse(self, path, exported=True):
-        """Generates a list of functions in the given binary.
+    Args:
+        backend (str): The symbol table reader to use - either ``native`` (the
+            default), a minimal ELF symbol table reader, or ``lief``. The
+            native reader falls back to LIEF for any file it cannot read.
+        jobs (int): The number of processes used to parse the object files in
+            a library - default: 1.
+    """
 
-        1. Extracts all object files from the target archive.
-        2. Parses object files for "exported" functions.
-        3. Returns the list of exported function names.
+    display = "generic-linux-library"
+
+    CHUNKS = 4
+    """The number of batches of object files per process.
+
+    Archive members vary wildly in size so using a few batches per process
+    evens out the load.
+    """
+
+    def __init__(self, *args, backend=BACKEND_NATIVE, jobs=1, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if backend not in BACKENDS:
+            raise exceptions.BlindHELIXException(
+                "unsupported parsing backend: {} (supported: {})".format(
+                    backend, ", ".join(BACKENDS)
+                )
+            )
+
+        self.backend = backend
+        self.jobs = jobs
+
+        self._index = None
+
+    def _parse_archive(self, path):
+        """Collect the symbol tables of all object files in an archive.
+
+        With more than one job, object files are split into contiguous batches
+        that are parsed in separate processes. Batches are merged in archive
+        order so the result is identical to a sequential parse.
+
+        Returns:
+            A list of ``Symbols`` for each object file, in archive order.
         """
 
-        functions = []
+        jobs = self.jobs
+
+        if jobs > 1 and multiprocessing.current_process().daemon:
+            logger.warning(
+                "cannot parse {} in parallel from a daemonic process".format(path)
+            )
+            jobs = 1
+
+        if jobs <= 1:
+            return _scan(path, self.backend)
+
+        objects = _objects(path)
+
+        if len(objects) < 2:
+            return _scan(path, self.backend)
+
+        chunks = min(len(objects), jobs * self.CHUNKS)
+        size = -(-len(objects) // chunks)
+
+        ranges = []
+
+        for i in range(0, len(objects), size):
+            batch = objects[i : i + size]
+            ranges.append((batch[0], batch[-1] + 1))
+
+        tables = []
+
+        with futures.ProcessPoolExecutor(min(jobs, len(ranges))) as executor:
+            batches = [
+                executor.submit(_scan, path, self.backend, start, stop)
+                for start, stop in ranges
+            ]
 
-        def add(binary):
-            for s in binary.symbols:
-                if not s.is_function or s.imported:
-                    continue
+            for batch in batches:
+                tables += batch.result()
 
-                if exported and not s.exported:
-                    continue
+        return tables
 
-                name = lief.demangle(s.name)
+    def _parse_executable(self, path):
+        binary = None
 
-                if name is not None:
-                    # Skipping C++ functions.
-                    # Experimentally, C++ functions are somewhat problematic
-                    # because they often contain a lot of template code that is
-                    # essentially the same across all instances. More experimenting
-                    # with C++ functions is necessary before attempting to include
-                    # them.
+        if self.backend == BACKEND_NATIVE:
+            try:
+                binary = elf.parse_file(path)
+            except elf.InvalidELF:
+                pass
 
-                    continue
+        if binary is None:
+            binary = lief.parse(path)
 
-                functions.append(s.name)
+        return [_symbols(binary, os.path.basename(path))]
 
-        with magic.Magic() as m:
-            filetype = m.id_filename(path)
+    def parse(self, path, exported=True):
+        """Generates a list of functions in the given binary.
 
-        if "ar archive" in filetype:
-            self._parse_archive(path, add)
+        1. Reads all object files from the target archive (in memory).
+        2. Parses object files for "exported" functions.
+        3. Returns the list of exported function names.
+        """
+
+        if archive.is_archive(path):
+            tables = self._parse_archive(path)
         else:
-            self._parse_executable(path, add)
+            tables = self._parse_executable(path)
 
-        return functions
+        return parser.Analysis(None, tables).functions(exported=exported)
 
-    def finalize(self, library):
-        """Make exported symbols unique for the given library.
+    def _flatten(self, library):
+        """Convert a thin archive into a regular archive.
 
-        This uses objcopy to prefix all exported symbols with the library name.
+        ``objcopy`` cannot rewrite thin archives, so their members are copied
+        into a regular (temporary) archive first. Members with duplicate names
+        are preserved.
+
+        Returns:
+            A temporary file with the regular archive or ``None`` if the
+            library is not a thin archive.
         """
 
-        symbols = []
+        with archive.Archive(library) as a:
+            if not a.thin:
+                return None
+
+            members = [os.path.join(os.path.dirname(a.path), m.name) for m in a]
+
+        regular = tempfile.NamedTemporaryFile(suffix=".a")
+        regular.write(archive.MAGIC)
+        regular.flush()
+
+        ar = helix_utils.find("ar")
+        helix_utils.run(
+            "{} qcs {} {}".format(
+                ar, regular.name, " ".join(shlex.quote(m) for m in members)
+            ),
+            exception=exceptions.BlindHELIXException(
+                "failed to convert thin archive: {}".format(library)
+            ),
+        )
+
+        return regular
 
-        def add(binary):
-            for e in binary.exported_symbols:
-                name = lief.demangle(e.name)
+    def _rewrite(self, library, symbols):
+        """Prefix the given symbols with the library name.
 
-                if name is None:
-                    symbols.append(e.name)
+        Args:
+            library (str): The path to the library file.
+            symbols (list): The symbols to rename.
+
+        Returns:
+            A tuple of the rewritten library (as a temporary file) and the
+            renaming that was applied.
+        """
 
-                # Skipping C++ symbols.
-                # See rationale in the parsing function for more details.
+        regular = self._flatten(library)
 
-        self._parse_archive(library, add)
+        if regular is not None:
+            library = regular.name
 
         unique = tempfile.NamedTemporaryFile()
         mapping = tempfile.NamedTemporaryFile()
 
+        renaming = {}
+
         for symbol in symbols:
-            mapping.write(
-                "{} {}_{}\n".format(symbol, self.name, symbol).encode("utf-8")
-            )
+            renaming[symbol] = "{}_{}".format(self.name, symbol)
+            mapping.write("{} {}\n".format(symbol, renaming[symbol]).encode("utf-8"))
 
         mapping.flush()
         mapping.seek(0)
@@ -130,8 +397,67 @@ class GenericLinuxLibrary(parser.LibraryParser):
             ),
         )
 
+        return unique, renaming
+
+    def finalize(self, library):
+        """Make exported symbols unique for the given library.
+
+        This uses objcopy to prefix all exported symbols with the library name.
+        """
+
+        symbols = [s for o in self._parse_archive(library) for s in o.exported]
+
+        unique, _ = self._rewrite(library, symbols)
+
         return unique
 
+    def analyze(self):
+        """Finalize and parse the target library in a single pass.
+
+        Symbol tables are collected from the original library once. The
+        finalized library's symbol tables are then derived by applying the same
+        renaming that ``objcopy`` applies to the library file rather than by
+        parsing the finalized library again.
+        """
+
+        if self._analysis is None:
+            path = self.path(self.name)
+
+            with events.span(events.PARSE, self.name):
+                objects = self._parse_archive(path)
+
+            symbols = [s for o in objects for s in o.exported]
+
+            with events.span(events.FINALIZE, self.name):
+                finalized, renaming = self._rewrite(path, symbols)
+
+            self._analysis = parser.Analysis(
+                finalized, [o.rename(renaming) for o in objects]
+            )
+
+        return self._analysis
+
+    _runtime = {}
+    """Runtime symbols by backend, shared by all parsers in this process."""
+
+    def index(self):
+        """Build a static reachability index of the target library.
+
+        The runtime symbols are collected once per process.
+        """
+
+        if self._index is None:
+            if self.backend not in GenericLinuxLibrary._runtime:
+                GenericLinuxLibrary._runtime[self.backend] = _trace_runtime(
+                    self.backend
+                )
+
+            self._index = reachability.Index(
+                self.analyze().objects, runtime=self._runtime[self.backend]
+            )
+
+        return self._index
+
 
 class VCPKGLinuxLibrary(utils.VCPKGParserMixin, GenericLinuxLibrary):
     display = "vcpkg-linux-library"
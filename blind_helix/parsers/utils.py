@@ -1,9 +1,13 @@
 import os
+import json
+import hashlib
+import platform
 import tempfile
-import subprocess
 
 from helix import utils as helix_utils
 
+from .. import cache
+from .. import events
 from .. import exceptions
 
 
@@ -11,6 +15,212 @@ class VCPKGError(exceptions.BlindHELIXException):
     """Errors specific to VCPKG."""
 
 
+def triplet():
+    """The VCPKG triplet that packages are installed for by default.
+
+    This is ``VCPKG_DEFAULT_TRIPLET`` if it is set, otherwise VCPKG's default
+    for this system (e.g., ``x64-linux``).
+    """
+
+    default = os.environ.get("VCPKG_DEFAULT_TRIPLET")
+
+    if default:
+        return default
+
+    machine = platform.machine().lower()
+    machine = {
+        "x86_64": "x64",
+        "amd64": "x64",
+        "aarch64": "arm64",
+        "i386": "x86",
+        "i686": "x86",
+    }.get(machine, machine)
+
+    system = platform.system().lower()
+    system = {"darwin": "osx"}.get(system, system)
+
+    return "{}-{}".format(machine, system)
+
+
+class VCPKGIndex:
+    """An index of the library files owned by each installed VCPKG package.
+
+    VCPKG records installed packages in its status database
+    (``vcpkg/status`` in the installed tree, plus incremental updates in
+    ``vcpkg/updates``) and the files owned by each package in
+    ``vcpkg/info/<package>_<version>_<triplet>.list``. These are read once
+    and the index is saved to the cache directory, where it is reused until
+    the status database changes, so that library files can be located
+    without running VCPKG at all.
+
+    Args:
+        root (str): The VCPKG installed tree (``installed`` next to the
+            ``vcpkg`` binary).
+        path (str): An optional cache directory (see ``cache.directory()``).
+    """
+
+    def __init__(self, root, path=None):
+        self.root = root
+        self.path = os.path.join(
+            cache.directory(path),
+            "vcpkg-{}.json".format(
+                hashlib.sha256(root.encode("utf-8")).hexdigest()[:16]
+            ),
+        )
+
+        self.packages = self._load()
+
+    def _database(self):
+        """List the status database files, in the order they apply."""
+
+        database = os.path.join(self.root, "vcpkg")
+        files = [os.path.join(database, "status")]
+
+        try:
+            updates = sorted(os.listdir(os.path.join(database, "updates")))
+        except FileNotFoundError:
+            updates = []
+
+        files += [os.path.join(database, "updates", u) for u in updates]
+
+        return [f for f in files if os.path.isfile(f)]
+
+    def _fingerprint(self):
+        fingerprint = []
+
+        for path in self._database():
+            stat = os.stat(path)
+            fingerprint.append([path, stat.st_mtime_ns, stat.st_size])
+
+        return fingerprint
+
+    def _installed(self):
+        """Read the status database.
+
+        Returns:
+            A set of ``(package, triplet)`` tuples for the installed packages.
+        """
+
+        statuses = {}
+
+        for path in self._database():
+            with open(path, "r", errors="replace") as f:
+                paragraphs = f.read().split("\n\n")
+
+            for paragraph in paragraphs:
+                fields = {}
+
+                for line in paragraph.splitlines():
+                    if ":" in line and not line[0].isspace():
+                        key, value = line.split(":", 1)
+                        fields[key.strip()] = value.strip()
+
+                if "Package" not in fields or "Architecture" not in fields:
+                    continue
+
+                # Feature paragraphs do not own any files.
+                if "Feature" in fields:
+                    continue
+
+                key = (fields["Package"], fields["Architecture"])
+                statuses[key] = fields.get("Status", "").split()
+
+        return set(
+            k for k, v in statuses.items() if v == ["install", "ok", "installed"]
+        )
+
+    def _scan(self):
+        """Collect the library files owned by each installed package.
+
+        Only release static libraries (``.a`` files in a ``lib`` directory,
+        outside of ``debug``) are included.
+
+        Returns:
+            A dictionary of library file paths (relative to ``root``) by
+            triplet, by package name.
+        """
+
+        installed = self._installed()
+        info = os.path.join(self.root, "vcpkg", "info")
+
+        packages = {}
+
+        try:
+            lists = sorted(os.listdir(info))
+        except FileNotFoundError:
+            lists = []
+
+        for name in lists:
+            if not name.endswith(".list"):
+                continue
+
+            # Port names and triplets never contain underscores.
+            stem = name[: -len(".list")]
+            package, architecture = stem.split("_")[0], stem.split("_")[-1]
+
+            if (package, architecture) not in installed:
+                continue
+
+            with open(os.path.join(info, name), "r", errors="replace") as f:
+                files = f.read().splitlines()
+
+            libraries = [
+                f
+                for f in files
+                if f.endswith(".a")
+                and os.path.basename(os.path.dirname(f)) == "lib"
+                and "debug" not in f.split("/")
+            ]
+
+            packages.setdefault(package, {})[architecture] = libraries
+
+        return packages
+
+    def _load(self):
+        fingerprint = self._fingerprint()
+
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+
+            if saved["fingerprint"] == fingerprint:
+                return saved["packages"]
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass
+
+        packages = self._scan()
+
+        # Written atomically since many processes may index at once.
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(self.path), delete=False
+        ) as f:
+            json.dump({"fingerprint": fingerprint, "packages": packages}, f)
+
+        os.replace(f.name, self.path)
+
+        return packages
+
+    def libraries(self, package, architecture=None):
+        """List the library files owned by a package.
+
+        Args:
+            package (str): The package name.
+            architecture (str): The triplet - default: ``triplet()``.
+
+        Returns:
+            A list of absolute paths to the package's library files, or
+            ``None`` if the package is not installed for the triplet.
+        """
+
+        architecture = architecture or triplet()
+        libraries = self.packages.get(package, {}).get(architecture)
+
+        if libraries is None:
+            return None
+
+        return [os.path.join(self.root, f) for f in libraries]
+
+
 class VCPKGParserMixin:
     """A mixin for using VCPKG for library file location.
 
@@ -18,9 +228,9 @@ class VCPKGParserMixin:
     in the ``PATH``) or that the user set the ``VCPKG_PATH`` environment
     variable to point ot the ``vcpkg`` binary.
 
-    Note:
-        VCPKG is not thread safe any may throw unexpected errors that cause
-        parsing to fail if multiple instances of it run at once.
+    Library files are located with a ``VCPKGIndex`` of the installed tree
+    rather than by running VCPKG, so many parsers may locate libraries at
+    once.
     """
 
     VCPKG_ENVIRONMENT_VARIABLE = "VCPKG_PATH"
@@ -39,34 +249,6 @@ class VCPKGParserMixin:
                 )
             )
 
-        self._build = tempfile.TemporaryDirectory()
-
-        stdout, _ = helix_utils.run("{} list {}".format(self.vcpkg, self.name))
-        if self.name.encode("utf-8") not in stdout:
-            stdout, _ = helix_utils.run("{} search {}".format(self.vcpkg, self.name))
-
-            if self.name.encode("utf-8") not in stdout:
-                raise VCPKGError("{} is not a valid VCPKG package".format(self.name))
-            else:
-                raise VCPKGError(
-                    "{} is not installed under VCPKG - please install it with `vcpkg install {}` first".format(
-                        self.name, self.name
-                    )
-                )
-
-        try:
-            helix_utils.run(
-                "{} install --x-install-root {} {}".format(
-                    self.vcpkg, self._build.name, self.name
-                )
-            )
-        except subprocess.CalledProcessError:
-            raise VCPKGError("failed to run install command on {}".format(self.name))
-
-    def __del__(self):
-        if hasattr(self, "_build"):
-            self._build.cleanup()
-
     def _filter_path(self, options):
         """Heuristics for selecting the correct library file.
 
@@ -118,22 +300,31 @@ class VCPKGParserMixin:
     def path(self, name):
         """Locate the main library file using VCPKG.
 
-        Install the package with VCPKG in a temporary install directory where
-        it is the only package. Then, select from the generated library files
-        according to filtering heuristics (if there are more than one).
+        Look up the library files owned by the package in the index of the
+        VCPKG installed tree. Then, select from those library files according
+        to filtering heuristics (if there are more than one).
+
+        VCPKG is not used if the path was given explicitly.
         """
 
-        options = []
+        if self._path:
+            return self._path
 
-        vcpkg_install_root = os.path.join(os.path.dirname(self.vcpkg), "installed")
+        with events.span(events.RESOLVE, name):
+            index = VCPKGIndex(os.path.join(os.path.dirname(self.vcpkg), "installed"))
+            options = index.libraries(name)
 
-        for root, dirs, files in os.walk(self._build.name):
-            if os.path.basename(root) == "lib" and "debug" not in root:
-                for name in files:
-                    if name.endswith(".a"):
-                        install_path = root.split(self._build.name)[-1][1:]
-                        options.append(
-                            os.path.join(vcpkg_install_root, install_path, name)
+            if options is None:
+                # Only run VCPKG to explain the failure.
+                stdout, _ = helix_utils.run("{} search {}".format(self.vcpkg, name))
+
+                if name.encode("utf-8") not in stdout:
+                    raise VCPKGError("{} is not a valid VCPKG package".format(name))
+                else:
+                    raise VCPKGError(
+                        "{} is not installed under VCPKG - please install it with `vcpkg install {}` first".format(
+                            name, name
                         )
+                    )
 
-        return self._filter_path(options)
+            return self._filter_path(options)
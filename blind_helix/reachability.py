@@ -0,0 +1,143 @@
+LINKER = frozenset(
+    [
+        "main",
+        "_DYNAMIC",
+        "_GLOBAL_OFFSET_TABLE_",
+        "__dso_handle",
+        "__ehdr_start",
+        "__executable_start",
+        "__bss_start",
+        "__data_start",
+        "data_start",
+        "_etext",
+        "etext",
+        "_edata",
+        "edata",
+        "_end",
+        "end",
+        "__TMC_END__",
+        "__preinit_array_start",
+        "__preinit_array_end",
+        "__init_array_start",
+        "__init_array_end",
+        "__fini_array_start",
+        "__fini_array_end",
+    ]
+)
+"""Symbols that are defined by the linker or the test program itself."""
+
+LINKER_PREFIXES = ("__start_", "__stop_")
+"""Prefixes of symbols that the linker defines for orphan sections."""
+
+
+def _linker(symbol):
+    return symbol in LINKER or symbol.startswith(LINKER_PREFIXES)
+
+
+class Index:
+    """A static reachability index of a library archive.
+
+    This mimics the way the linker pulls archive members into a program that
+    references a single function: the member defining the function is linked,
+    then every member defining a symbol that a linked member references, and
+    so on. Anything still unresolved must come from the runtime libraries
+    that are linked by default, otherwise the link fails.
+
+    Args:
+        objects (list): A ``Symbols`` table for each object in the library, in
+            archive order - typically ``Analysis.objects``.
+        runtime (set): The symbols available from the libraries that are
+            linked by default.
+    """
+
+    def __init__(self, objects, runtime=None):
+        self.objects = objects
+        self.runtime = runtime or set()
+
+        self.definitions = {}
+
+        for i, o in enumerate(objects):
+            for symbol in o.defined:
+                # Like the linker, the first member defining a symbol wins.
+                self.definitions.setdefault(symbol, i)
+
+        self._closures = {}
+
+    def _closure(self, start):
+        if start not in self._closures:
+            members = set([start])
+            queue = [start]
+            unresolved = set()
+
+            while queue:
+                for symbol in self.objects[queue.pop()].undefined:
+                    member = self.definitions.get(symbol)
+
+                    if member is None:
+                        if symbol not in self.runtime and not _linker(symbol):
+                            unresolved.add(symbol)
+                    elif member not in members:
+                        members.add(member)
+                        queue.append(member)
+
+            self._closures[start] = (sorted(members), sorted(unresolved))
+
+        return self._closures[start]
+
+    def closure(self, function):
+        """Compute the objects linked in to support a function.
+
+        Args:
+            function (str): A function defined in the library.
+
+        Returns:
+            A tuple of the indexes of the objects linked in and the symbols
+            that cannot be resolved, or ``None`` if ``function`` is not
+            defined in the library.
+        """
+
+        start = self.definitions.get(function)
+
+        if start is None:
+            return None
+
+        return self._closure(start)
+
+    def unresolved(self, function):
+        """List the symbols a function references that cannot be resolved.
+
+        Args:
+            function (str): A function defined in the library.
+
+        Returns:
+            A sorted list of symbol names (empty if a program using
+            ``function`` should link) or ``None`` if ``function`` is unknown.
+        """
+
+        closure = self.closure(function)
+
+        if closure is None:
+            return None
+
+        return closure[1]
+
+    def included(self, function):
+        """Predict the library functions included with a function.
+
+        Args:
+            function (str): A function defined in the library.
+
+        Returns:
+            A sorted list of the functions defined by every object linked in to
+            support ``function``, or ``None`` if ``function`` is unknown.
+        """
+
+        closure = self.closure(function)
+
+        if closure is None:
+            return None
+
+        return sorted(set(f for i in closure[0] for f in self.objects[i].functions))
+
+
+__all__ = ["Index"]
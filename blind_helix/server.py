@@ -0,0 +1,366 @@
+import io
+import os
+import json
+import time
+import queue
+import shutil
+import socket
+import logging
+import tempfile
+import socketserver
+
+from helix import exceptions as helix_exceptions
+from helix import transform
+from helix import utils as helix_utils
+
+from . import cache
+from . import utils
+from . import errors
+from . import component
+from . import exceptions
+
+SERVER_ENVIRONMENT_VARIABLE = "BLIND_HELIX_SERVER"
+
+SOCKET = "server.sock"
+"""The name of the default socket in the cache directory."""
+
+VERSION = 1
+"""The version of the request/response protocol."""
+
+logger = logging.getLogger(__name__)
+
+
+class ServerError(exceptions.BlindHELIXException):
+    """Raised when the build server cannot be reached or a request fails."""
+
+
+def address(path=None):
+    """Locate the build server socket.
+
+    Args:
+        path (str): An optional, explicit socket path. If this is not provided,
+            the ``BLIND_HELIX_SERVER`` environment variable is used if set,
+            otherwise ``server.sock`` in the cache directory.
+
+    Returns:
+        The absolute path to the socket.
+    """
+
+    if not path:
+        path = os.environ.get(SERVER_ENVIRONMENT_VARIABLE)
+
+    if not path:
+        path = os.path.join(cache.directory(), SOCKET)
+
+    return os.path.abspath(os.path.expanduser(path))
+
+
+def _read(stream):
+    return stream.getvalue().decode("utf-8", errors="replace").strip("\n")
+
+
+class Slice(component.LibrarySliceComponent):
+    """The Component built for a single request.
+
+    Only the library path and function are sent to the server - they are set
+    on a subclass of this for each request.
+    """
+
+    name = "blind-helix-server-slice"
+    verbose_name = "Blind HELIX Server Slice"
+    description = "A library slice built by the Blind HELIX build server"
+    version = "1.0.0"
+    date = ""
+
+    library = ""
+    path = ""
+    function = ""
+
+    _blueprints = {}
+
+    @classmethod
+    def load_blueprint(cls, name):
+        """Load a Blueprint class once for the life of the server."""
+
+        if name not in cls._blueprints:
+            cls._blueprints[name] = super().load_blueprint(name)
+
+        return cls._blueprints[name]
+
+
+class Slot:
+    """A scratch CMake project that is reused between builds.
+
+    The project is configured once. For every build the Blueprint is generated
+    into a staging directory and only the files that changed are copied into
+    the project, so that CMake only needs to recompile the test program and
+    relink it (and only reconfigures when the library path changes).
+
+    Args:
+        directory (str): The directory in which to create the project.
+    """
+
+    def __init__(self, directory):
+        self.source = os.path.join(directory, "source")
+        self.stage = os.path.join(directory, "stage")
+        self.build = os.path.join(self.source, "build")
+
+        os.makedirs(self.build)
+        os.makedirs(self.stage)
+
+        self.configured = False
+
+    def _synchronize(self):
+        for name in os.listdir(self.stage):
+            staged = os.path.join(self.stage, name)
+            target = os.path.join(self.source, name)
+
+            with open(staged, "rb") as f:
+                content = f.read()
+
+            try:
+                with open(target, "rb") as f:
+                    changed = f.read() != content
+            except FileNotFoundError:
+                changed = True
+
+            if changed:
+                os.replace(staged, target)
+            else:
+                os.remove(staged)
+
+    def run(self, library, function, limits=None):
+        """Build a single library function.
+
+        Args:
+            library (str): The path to the library file.
+            function (str): The name of the library function.
+            limits (Limits): Optional resource limits for the build (see
+                ``utils.Limits``).
+
+        Returns:
+            A response dictionary with ``succeeded``, ``stdout``, ``stderr``,
+            ``artifacts`` and ``usage`` (see ``utils.Usage.todict()``) keys.
+            Artifacts are copied to a new directory which the client is
+            responsible for removing.
+        """
+
+        blueprint = type(
+            "Slice",
+            (Slice,),
+            {"library": library, "path": library, "function": function},
+        ).blueprint()
+
+        sources = blueprint.generate(self.stage)
+        blueprint.transform(transform.Transform.TYPE_SOURCE, sources)
+
+        self._synchronize()
+
+        binary = os.path.join(self.build, blueprint.build_name)
+        linker_map = os.path.join(self.build, Slice.MAP)
+
+        for path in (binary, linker_map):
+            if os.path.exists(path):
+                os.remove(path)
+
+        cmake = helix_utils.find("cmake")
+        stdout, stderr = io.BytesIO(), io.BytesIO()
+
+        # The project is reused, so only files written by this build count.
+        usage = utils.Usage(builds=1)
+        started = time.time()
+
+        try:
+            if not self.configured:
+                utils.run(
+                    "{} ..".format(cmake),
+                    self.build,
+                    helix_exceptions.BuildFailure("cmake invocation failed"),
+                    stdout=stdout,
+                    stderr=stderr,
+                    usage=usage,
+                )
+
+                self.configured = True
+
+            utils.run(
+                "{} --build .".format(cmake),
+                self.build,
+                helix_exceptions.BuildFailure("make invocation failed"),
+                stdout=stdout,
+                stderr=stderr,
+                abort=errors.classify,
+                limits=limits,
+                usage=usage,
+            )
+        except helix_exceptions.BuildFailure:
+            succeeded = False
+
+            # The build may have been stopped part way through (see
+            # ``utils.run()``) - make sure the sources are rebuilt next time.
+            for source in sources:
+                path = os.path.join(self.source, os.path.basename(source))
+
+                if os.path.exists(path):
+                    os.remove(path)
+        else:
+            succeeded = os.path.isfile(binary)
+
+        usage.written = utils.written(self.source, started)
+
+        artifacts = None
+
+        if succeeded:
+            output = tempfile.mkdtemp(prefix="blind-helix-")
+
+            artifacts = [shutil.copy2(binary, output)]
+
+            if os.path.isfile(linker_map):
+                shutil.copy2(linker_map, output)
+
+        return {
+            "succeeded": succeeded,
+            "stdout": _read(stdout),
+            "stderr": _read(stderr),
+            "artifacts": artifacts,
+            "usage": usage.todict(),
+        }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode("utf-8"))
+
+            if request.get("version") != VERSION:
+                raise ValueError(
+                    "unsupported protocol version: {}".format(request.get("version"))
+                )
+
+            library, function = request["library"], request["function"]
+            limits = utils.Limits(**request.get("limits", {}))
+        except (ValueError, KeyError, AttributeError, TypeError) as e:
+            response = {"error": "invalid request: {}".format(e)}
+        else:
+            slot = self.server.slots.get()
+
+            try:
+                logger.debug("building {} from {}".format(function, library))
+                response = slot.run(library, function, limits=limits)
+            except Exception as e:
+                logger.exception("build failed")
+                response = {"error": "{}: {}".format(e.__class__.__name__, e)}
+            finally:
+                self.server.slots.put(slot)
+
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A long-lived local build server.
+
+    Building a Component from scratch configures a new CMake project, which
+    probes the toolchain every time. The server keeps ``jobs`` configured
+    scratch projects (see ``Slot``) and builds every request in one of them,
+    so only the compile and link steps are repeated. Clients (see
+    ``engines.ServerEngine``) connect over a Unix socket and may be shared
+    between any number of processes - e.g., ``parse-many`` workers.
+
+    Args:
+        path (str): The socket path (see ``address()``).
+        jobs (int): The number of builds to run at once - default: 1.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path=None, jobs=1):
+        path = address(path)
+
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+            try:
+                probe.connect(path)
+            except OSError:
+                # Left behind by a server that did not shut down cleanly.
+                os.remove(path)
+            else:
+                raise ServerError("a server is already listening on {}".format(path))
+            finally:
+                probe.close()
+
+        self.working = tempfile.TemporaryDirectory()
+        self.slots = queue.Queue()
+
+        for i in range(jobs):
+            self.slots.put(Slot(os.path.join(self.working.name, str(i))))
+
+        super().__init__(path, _Handler)
+
+    def server_close(self):
+        super().server_close()
+
+        try:
+            os.remove(self.server_address)
+        except FileNotFoundError:
+            pass
+
+        self.working.cleanup()
+
+
+class Client:
+    """A build server client.
+
+    Args:
+        path (str): The socket path (see ``address()``).
+    """
+
+    def __init__(self, path=None):
+        self.path = address(path)
+
+    def build(self, library, function, limits=None):
+        """Build a single library function on the server.
+
+        Args:
+            library (str): The path to the library file.
+            function (str): The name of the library function.
+            limits (Limits): Optional resource limits for the build (see
+                ``utils.Limits``).
+
+        Returns:
+            The response dictionary (see ``Slot.run()``).
+        """
+
+        request = {"version": VERSION, "library": library, "function": function}
+
+        if limits is not None:
+            request["limits"] = {
+                "timeout": limits.timeout,
+                "cpu": limits.cpu,
+                "memory": limits.memory,
+            }
+
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(self.path)
+                s.sendall(json.dumps(request).encode("utf-8") + b"\n")
+
+                with s.makefile("rb") as f:
+                    response = f.readline()
+        except OSError as e:
+            raise ServerError(
+                "could not reach the build server at {}: {}".format(self.path, e)
+            )
+
+        try:
+            response = json.loads(response.decode("utf-8"))
+        except ValueError:
+            raise ServerError("invalid response from the build server")
+
+        if "error" in response:
+            raise ServerError("build server error: {}".format(response["error"]))
+
+        return response
+
+
+__all__ = ["Server", "Client", "ServerError", "address"]
@@ -1,5 +1,13 @@
+import os
 import sys
+import signal
 import logging
+import threading
+import subprocess
+import collections
+import concurrent.futures
+
+from . import jobserver
 
 
 class COLOR:
@@ -59,3 +67,400 @@ def color(text, *colors, stream=sys.stdout):
         return "{}{}{}".format("".join(colors), text, COLOR.END)
     else:
         return text
+
+
+def imap(function, iterable, jobs=1):
+    """Apply a function to each item of an iterable, possibly in parallel.
+
+    This is similar to the builtin ``map()`` except that up to ``jobs`` calls
+    are run concurrently in a pool of threads. Results are always yielded in
+    the order of ``iterable``. At most ``2 * jobs`` items are in flight at a
+    time so that completed results do not pile up behind a slow item.
+
+    Args:
+        function (callable): The function to apply.
+        iterable (iterable): The items to which ``function`` is applied.
+        jobs (int): The maximum number of concurrent calls - default: 1.
+
+    Returns:
+        A generator of results, in order.
+
+    Note:
+        Threads are used rather than processes because the work is expected to
+        be dominated by subprocesses (e.g., builds) and because the items
+        (e.g., dynamically generated classes) are not necessarily picklable.
+        Exceptions raised by ``function`` are raised when the corresponding
+        result is reached and any pending calls are cancelled.
+    """
+
+    if jobs <= 1:
+        for item in iterable:
+            yield function(item)
+
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = collections.deque()
+
+        try:
+            for item in iterable:
+                pending.append(executor.submit(function, item))
+
+                if len(pending) >= 2 * jobs:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+TIMED_OUT = "blind-helix: command timed out"
+"""Written to the stderr of a command that is stopped by its timeout."""
+
+
+class Limits:
+    """Resource limits applied to a command (see ``run()``).
+
+    Args:
+        timeout (int): The maximum wall-clock time of the command in seconds.
+        cpu (int): The maximum CPU time of each process in seconds.
+        memory (int): The maximum address space of each process in bytes.
+
+    Note:
+        CPU and memory limits are applied with ``ulimit`` so they hold for
+        every process started by the command (e.g., the compiler and the
+        linker started by ``make``) individually.
+    """
+
+    def __init__(self, timeout=None, cpu=None, memory=None):
+        self.timeout = timeout
+        self.cpu = cpu
+        self.memory = memory
+
+    @property
+    def ulimit(self):
+        """A list of ``ulimit`` commands that apply the CPU and memory limits."""
+
+        commands = []
+
+        if self.cpu:
+            commands.append("ulimit -t {}".format(int(self.cpu)))
+        if self.memory:
+            commands.append("ulimit -v {}".format(int(self.memory) // 1024))
+
+        return commands
+
+    def wrap(self, cmd):
+        """Prefix a shell command so that it runs with these limits.
+
+        Args:
+            cmd (str): The shell command.
+
+        Returns:
+            The modified shell command.
+        """
+
+        return " && ".join(self.ulimit + [cmd])
+
+
+class Usage:
+    """The resources used by one or more commands (see ``run()``).
+
+    Args:
+        user (float): CPU time spent in user mode, in seconds.
+        system (float): CPU time spent in the kernel, in seconds.
+        memory (int): The peak resident set size of the largest process, in
+            bytes.
+        written (int): The number of bytes written to the working directory
+            (see ``written()``).
+        builds (int): The number of builds these resources were used by.
+    """
+
+    def __init__(self, user=0.0, system=0.0, memory=0, written=0, builds=0):
+        self.user = user
+        self.system = system
+        self.memory = memory
+        self.written = written
+        self.builds = builds
+
+    @classmethod
+    def rusage(cls, rusage):
+        """Create from the resource usage of a process tree.
+
+        Args:
+            rusage: A ``resource.struct_rusage`` (e.g., from ``os.wait4()``).
+        """
+
+        # Linux reports the peak resident set size in kibibytes, macOS in
+        # bytes.
+        scale = 1 if sys.platform == "darwin" else 1024
+
+        return cls(
+            user=rusage.ru_utime,
+            system=rusage.ru_stime,
+            memory=rusage.ru_maxrss * scale,
+        )
+
+    def add(self, other):
+        """Add the resources used by another command to these.
+
+        CPU time and bytes written accumulate, while the peak memory is the
+        largest of the two.
+
+        Args:
+            other (Usage): The resources to add.
+        """
+
+        self.user += other.user
+        self.system += other.system
+        self.memory = max(self.memory, other.memory)
+        self.written += other.written
+        self.builds += other.builds
+
+    def split(self, count):
+        """Divide these resources evenly between a number of builds.
+
+        Args:
+            count (int): The number of builds.
+
+        Returns:
+            The share of each build, as a new ``Usage``. The peak memory is not
+            divided - it is the peak of every build.
+        """
+
+        return Usage(
+            user=self.user / count,
+            system=self.system / count,
+            memory=self.memory,
+            written=self.written // count,
+            builds=1,
+        )
+
+    def todict(self):
+        """Convert to a JSON-serializable dictionary."""
+
+        return {
+            "user": self.user,
+            "system": self.system,
+            "memory": self.memory,
+            "written": self.written,
+            "builds": self.builds,
+        }
+
+    @classmethod
+    def fromdict(cls, data):
+        """Create from a dictionary returned by ``todict()``."""
+
+        return cls(**data)
+
+
+def written(path, since):
+    """Count the bytes written to a directory.
+
+    Args:
+        path (str): The directory.
+        since (float): The time the writes started (seconds since the epoch).
+
+    Returns:
+        The total size of the files in ``path`` (recursively) that were
+        modified after ``since``.
+    """
+
+    total = 0
+
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                status = os.lstat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+
+            if status.st_mtime >= since:
+                total += status.st_size
+
+    return total
+
+
+def _kill(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def run(
+    cmd,
+    cwd=None,
+    exception=None,
+    propagate=False,
+    stdout=None,
+    stderr=None,
+    abort=None,
+    limits=None,
+    usage=None,
+):
+    """Run the given command as a subprocess, streaming its output.
+
+    This is a drop-in replacement for ``helix.utils.run()`` that reads the
+    command's output while it runs rather than once it exits, so that a
+    failing command can be stopped early.
+
+    Args:
+        cmd (str): The command to run.
+        cwd (str): The working directory in which to run the command.
+        exception: An exception to raise if the command fails.
+        propagate (bool): If ``True``, command output is written to stdout and
+            stderr of the current process rather than captured (and
+            ``abort`` is ignored). Default: ``False``.
+        stdout (file): An open file-like object where stdout should be written
+            or ``None``.
+        stderr (file): An open file-like object where stderr should be written
+            or ``None``.
+        abort (function): An optional function called with each line the
+            command writes to stderr. If it returns a true value the command
+            and every process it started are killed and the command fails.
+        limits (Limits): Optional resource limits. If the command runs for
+            longer than the timeout it is killed, fails, and ``TIMED_OUT`` is
+            written to its stderr.
+        usage (Usage): An optional ``Usage`` to which the CPU time and peak
+            memory of the command and every process it started are added.
+
+    Returns:
+        Output to stdout and stderr as binary strings.
+
+    Note:
+        The command is run in a new session so that its whole process tree
+        (e.g., ``make``, the compiler and the linker) can be killed at once.
+        If a jobserver is configured, the command waits for a token first and
+        - unless it may be killed by ``abort`` or the timeout - ``make`` joins
+        the jobserver (see ``jobserver``).
+    """
+
+    cwd = cwd or os.path.abspath(".")
+    limits = limits or Limits()
+
+    # Tokens taken by ``make`` are lost if it is killed, so only commands that
+    # are never killed share the jobserver.
+    killable = limits.timeout or (abort is not None and not propagate)
+
+    server = jobserver.client()
+    slot = server.acquire(shared=not killable) if server is not None else None
+
+    try:
+        process = subprocess.Popen(
+            limits.wrap(cmd),
+            cwd=cwd,
+            shell=True,
+            stdout=None if propagate else subprocess.PIPE,
+            stderr=None if propagate else subprocess.PIPE,
+            start_new_session=True,
+            env=slot.environment if slot is not None else None,
+            pass_fds=slot.descriptors if slot is not None else (),
+        )
+    except BaseException:
+        if slot is not None:
+            slot.release()
+        raise
+
+    expired = threading.Event()
+
+    def expire():
+        expired.set()
+        _kill(process)
+
+    timer = None
+    if limits.timeout:
+        timer = threading.Timer(limits.timeout, expire)
+        timer.start()
+
+    output, errors = None, None
+    aborted = False
+
+    try:
+        if not propagate:
+            # Read stdout concurrently so that neither pipe can fill up and
+            # block the command.
+            chunks = []
+            reader = threading.Thread(
+                target=lambda: chunks.append(process.stdout.read())
+            )
+            reader.start()
+
+            lines = []
+
+            for line in process.stderr:
+                lines.append(line)
+
+                if (
+                    abort is not None
+                    and not aborted
+                    and abort(line.decode("utf-8", errors="replace"))
+                ):
+                    logging.getLogger(__name__).debug(
+                        "aborting after a known error: {}".format(cmd)
+                    )
+
+                    _kill(process)
+                    aborted = True
+
+            reader.join()
+
+            process.stdout.close()
+            process.stderr.close()
+
+            output, errors = b"".join(chunks), b"".join(lines)
+
+        # Unlike ``wait()``, ``wait4()`` reports the resources used by the
+        # process - including every descendant it waited for, so the whole
+        # build rather than just the shell.
+        _, status, rusage = os.wait4(process.pid, 0)
+
+        if os.WIFSIGNALED(status):
+            returncode = -os.WTERMSIG(status)
+        else:
+            returncode = os.WEXITSTATUS(status)
+
+        process.returncode = returncode
+
+        # The timer may fire after the command has exited but before it is
+        # cancelled - the command only timed out if it was killed.
+        timed_out = expired.is_set() and os.WIFSIGNALED(status)
+
+        if usage is not None:
+            usage.add(Usage.rusage(rusage))
+    except BaseException:
+        _kill(process)
+        raise
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+        if slot is not None:
+            slot.release()
+
+    if timed_out:
+        message = "{} after {} seconds\n".format(TIMED_OUT, limits.timeout)
+
+        if propagate:
+            sys.stderr.write(message)
+        else:
+            errors += message.encode("utf-8")
+
+    if aborted or timed_out:
+        returncode = returncode or -signal.SIGKILL
+
+    if stdout and output:
+        stdout.write(output)
+        stdout.flush()
+    if stderr and errors:
+        stderr.write(errors)
+        stderr.flush()
+
+    if returncode != 0:
+        if exception:
+            raise exception
+        raise subprocess.CalledProcessError(cmd=cmd, returncode=returncode)
+
+    return output, errors
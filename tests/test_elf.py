@@ -0,0 +1,32 @@
+import os
+import tempfile
+import unittest
+
+from blind_helix.parsers import elf
+
+
+class ParseFileTests(unittest.TestCase):
+    def parse(self, content):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(content)
+
+        try:
+            return elf.parse_file(f.name)
+        finally:
+            os.unlink(f.name)
+
+    def test_not_elf(self):
+        with self.assertRaises(elf.InvalidELF):
+            self.parse(b"this is not an ELF file\n")
+
+    def test_truncated(self):
+        with self.assertRaises(elf.InvalidELF):
+            self.parse(elf.MAGIC + bytes([elf.ELFCLASS64, elf.ELFDATA2LSB]) + bytes(10))
+
+    def test_empty(self):
+        with self.assertRaises(elf.InvalidELF):
+            self.parse(b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
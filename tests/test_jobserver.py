@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from blind_helix import jobserver
+from blind_helix import utils
+
+MAKEFILE = """all: a b c d
+
+a b c d:
+\tsleep 0.5
+\techo started $@ >&2
+\tsleep 30
+"""
+
+
+def count(server):
+    """Count the tokens in a jobserver's pool, leaving them in place."""
+
+    os.set_blocking(server.fd, False)
+
+    try:
+        tokens = b""
+
+        while True:
+            try:
+                token = os.read(server.fd, server.tokens + 1)
+            except BlockingIOError:
+                break
+
+            if not token:
+                break
+
+            tokens += token
+    finally:
+        os.set_blocking(server.fd, True)
+
+    os.write(server.fd, tokens)
+
+    return len(tokens)
+
+
+@unittest.skipIf(shutil.which("make") is None, "make is not installed")
+class JobserverTests(unittest.TestCase):
+    TOKENS = 4
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        with open(os.path.join(self.directory, "Makefile"), "w") as f:
+            f.write(MAKEFILE)
+
+        self.server = jobserver.Jobserver(self.TOKENS)
+        jobserver.configure(self.server.path)
+
+    def tearDown(self):
+        jobserver.configure(None)
+        self.server.close()
+        shutil.rmtree(self.directory)
+
+    def test_timeout_restores_tokens(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            utils.run("make", self.directory, limits=utils.Limits(timeout=1))
+
+        self.assertEqual(count(self.server), self.TOKENS)
+
+    def test_abort_restores_tokens(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            utils.run("make", self.directory, abort=lambda line: "started" in line)
+
+        self.assertEqual(count(self.server), self.TOKENS)
+
+    def test_make_shares_jobserver(self):
+        with open(os.path.join(self.directory, "Makefile"), "w") as f:
+            f.write("all: a b c d\n\na b c d:\n\t@echo $(MAKEFLAGS)\n")
+
+        output, _ = utils.run("make", self.directory)
+
+        self.assertIn(b"--jobserver-auth=", output)
+        self.assertEqual(count(self.server), self.TOKENS)
+
+
+if __name__ == "__main__":
+    unittest.main()